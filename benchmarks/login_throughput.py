@@ -0,0 +1,55 @@
+# benchmarks/login_throughput.py
+"""
+Login (bcrypt verify) throughput vs. number of hashing worker processes.
+
+Request threads are simulated with a thread pool, like FastAPI's sync route
+threadpool. workers=0 is the old behaviour: bcrypt runs on the request thread
+while holding the GIL, so extra threads add nothing.
+
+    python benchmarks/login_throughput.py --logins 200 --threads 40
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hasher import PasswordHasher, pwd_context  # noqa: E402
+
+
+def measure(workers, logins, threads, hashed):
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+    # Warm the pool so process start-up isn't counted
+    hasher.verify("password123", hashed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as request_threads:
+        results = list(request_threads.map(lambda _: hasher.verify("password123", hashed), range(logins)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput against hashing worker count")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=40, help="simulated request threads")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("password123")
+    worker_counts = [0] + [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= args.max_workers]
+    if args.max_workers not in worker_counts:
+        worker_counts.append(args.max_workers)
+
+    print(f"{'workers':>8} {'logins/s':>10}")
+    for workers in worker_counts:
+        print(f"{workers:>8} {measure(workers, args.logins, args.threads, hashed):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/order_query_counts.py
+"""
+Assert the exact number of SQL statements each order read path issues.
+
+Needs a database with at least --orders orders (the newest ones are used).
+Exits non-zero if any path drifts from its expected count, e.g. because a
+lazy load crept back in.
+
+    python benchmarks/order_query_counts.py --orders 20
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+from db import SessionLocal, engine  # noqa: E402
+from domains.order.models import Order  # noqa: E402
+from domains.order.service import ORDER_DETAIL_LOAD, OrderService  # noqa: E402
+from metrics import count_queries  # noqa: E402
+
+
+def touch(order):
+    # Serialize the way a response would, so lazy loads would show up in the count
+    return ([item.quantity * item.unit_price for item in order.items],
+            order.tracking.carrier if order.tracking else None)
+
+
+# name -> (expected statements, callable(service, order_ids))
+READ_PATHS = {
+    # GET /orders/{id}: OrderSchema is columns only
+    "get_order_columns": (1, lambda service, ids: service.get_order(ids[0], load=())),
+    # Full detail: order + joined tracking, items via one SELECT ... IN
+    "get_order_detail": (2, lambda service, ids: touch(service.get_order(ids[0], load=ORDER_DETAIL_LOAD))),
+    "get_order_detail_with_customer": (2, lambda service, ids: service.get_order(ids[0], load=ORDER_DETAIL_LOAD + ("customer",)).customer),
+    # List view: constant regardless of how many orders are read
+    "get_orders_detail": (2, lambda service, ids: [touch(order) for order in service.get_orders(ids, load=ORDER_DETAIL_LOAD)]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query counts of order read paths")
+    parser.add_argument("--orders", type=int, default=20)
+    args = parser.parse_args()
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        order_ids = db.execute(select(Order.id).order_by(Order.id.desc()).limit(args.orders)).scalars().all()
+        if not order_ids:
+            sys.exit("No orders in the database to read")
+
+        for name, (expected, read) in READ_PATHS.items():
+            db.expunge_all()
+            with count_queries(engine) as counter:
+                read(OrderService(db), order_ids)
+            status = "ok" if counter.count == expected else "FAIL"
+            failures += status == "FAIL"
+            print(f"{status:<5}{name:<34} expected={expected} actual={counter.count}")
+            if status == "FAIL":
+                for statement in counter.statements:
+                    print("      " + " ".join(statement.split())[:160])
+    finally:
+        db.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/serialization.py
+"""
+Compare event serializers on the payloads the services actually publish.
+
+Payloads are built with the same helpers the producers use and wrapped in
+the producer's message envelope. Reports encode/decode time per message and
+encoded size for stdlib json, the configured JSON backend (orjson when
+installed) and msgpack.
+
+    python benchmarks/serialization.py --number 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402,F401  (first: models import through db's Base)
+import serialization  # noqa: E402
+from domains.inventory.availability import FulfillmentPlan  # noqa: E402
+from domains.inventory.reservation import InventoryReservationEngine  # noqa: E402
+from domains.order.schemas import OrderCreateSchema, OrderItemSchema  # noqa: E402
+from domains.order.service import order_created_payload  # noqa: E402
+
+
+def envelope(event_type, payload):
+    # Same shape as KafkaProducer.publish_event
+    return {"event_type": event_type, "payload": payload, "timestamp": int(time.time() * 1000)}
+
+
+def sample_events():
+    order = OrderCreateSchema(customer_id=4821, items=[
+        OrderItemSchema(product_id=1000 + i, quantity=i + 1, unit_price=19.99 + i) for i in range(5)
+    ])
+    reserve = {"order_id": 90211, "item_id": 5531, "product_id": 1002, "quantity": 3}
+    return {
+        "order_created": envelope("order_created", order_created_payload(90211, order)),
+        "reserve_inventory": envelope("reserve_inventory", reserve),
+        "inventory_reserved": envelope("inventory_reserved", InventoryReservationEngine._result(
+            reserve, 5531, "reserved", remaining=117
+        )),
+        "inventory_updated": envelope("inventory_updated", {"id": 5531, "product_id": 1002, "quantity": 117}),
+        "fulfillment_planned": envelope("fulfillment_planned", dict(FulfillmentPlan(
+            {3: {1000: 1, 1001: 2, 1002: 3}, 7: {1003: 4, 1004: 5}}, {}
+        ).to_dict(), order_id=90211)),
+        "low_stock_alerts": envelope("low_stock_alerts", {"window_seconds": 60.0, "items": [
+            {"item_id": 5000 + i, "product_id": 1000 + i, "quantity": i % 10, "threshold": 10} for i in range(25)
+        ]}),
+    }
+
+
+class StdlibJson:
+    name = "json (stdlib)"
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data.decode("utf-8"))
+
+
+def backends():
+    found = [StdlibJson()]
+    if serialization.orjson is not None:
+        found.append(serialization.JsonSerializer())
+    if serialization.msgpack is not None:
+        found.append(serialization.MsgpackSerializer())
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event serializers")
+    parser.add_argument("--number", type=int, default=20000, help="messages per measurement")
+    args = parser.parse_args()
+
+    events = sample_events()
+    print(f"{'event':<22}{'backend':<16}{'bytes':>7}{'encode us':>11}{'decode us':>11}")
+    for event_name, message in events.items():
+        for backend in backends():
+            name = "orjson" if isinstance(backend, serialization.JsonSerializer) else backend.name
+            encoded = backend.dumps(message)
+            assert backend.loads(encoded)["payload"] == json.loads(json.dumps(message))["payload"]
+            encode_us = timeit.timeit(lambda: backend.dumps(message), number=args.number) / args.number * 1e6
+            decode_us = timeit.timeit(lambda: backend.loads(encoded), number=args.number) / args.number * 1e6
+            print(f"{event_name:<22}{name:<16}{len(encoded):>7}{encode_us:>11.2f}{decode_us:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/startup_time.py
+"""
+Measure import-to-ready time for main:app.
+
+Each run starts a fresh interpreter, imports main and enters the app's
+lifespan (startup handlers), which is what every uvicorn worker pays on boot.
+
+    python benchmarks/startup_time.py --runs 10
+    python benchmarks/startup_time.py --runs 10 --skip-db   # no database needed
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter
+CHILD_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def ready():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready_at = asyncio.run(ready())
+print(json.dumps({"import_ms": (imported - start) * 1000, "ready_ms": (ready_at - start) * 1000}))
+"""
+
+
+def run_once(env):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The app logs during startup, the timing line is the last line on stdout
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(label, values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    print(f"{label:<10} min={values[0]:8.1f}ms  median={statistics.median(values):8.1f}ms  p95={p95:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import-to-ready time of main:app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-db", action="store_true", help="set DB_STARTUP_MODE=skip for the runs")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.skip_db:
+        env["DB_STARTUP_MODE"] = "skip"
+
+    samples = [run_once(env) for _ in range(args.runs)]
+    summarize("import", [s["import_ms"] for s in samples])
+    summarize("ready", [s["ready_ms"] for s in samples])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,39 @@
 # consumer.py
 from confluent_kafka import Consumer, KafkaError
-import json
 import logging
+import os
 import threading
 
+from serialization import DeserializationError, decode_message
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Most messages taken per consume() call, and how long to wait to fill a batch
+KAFKA_CONSUMER_BATCH_SIZE = int(os.getenv("KAFKA_CONSUMER_BATCH_SIZE", "500"))
+KAFKA_CONSUMER_BATCH_TIMEOUT = float(os.getenv("KAFKA_CONSUMER_BATCH_TIMEOUT", "1.0"))
+
+def event_type_of(value):
+    """
+    Handler key of a decoded message: event_type for our own events, the
+    Debezium op ('c', 'u', 'd', 'r') for CDC rows, which ExtractNewRecordState
+    (add.fields=op) flattens into the row as __op
+    """
+    return value.get('event_type') or value.get('__op')
+
 class KafkaConsumer:
-    def __init__(self, bootstrap_servers='kafka:9092', group_id='ecommerce_group'):
+    def __init__(self, bootstrap_servers='kafka:9092', group_id='ecommerce_group', auto_offset_reset='earliest',
+                 batch_size=KAFKA_CONSUMER_BATCH_SIZE, batch_timeout=KAFKA_CONSUMER_BATCH_TIMEOUT):
         self.consumer = Consumer({
             'bootstrap.servers': bootstrap_servers,
             'group.id': group_id,
-            'auto.offset.reset': 'earliest'
+            'auto.offset.reset': auto_offset_reset
         })
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
         self.running = False
         self.handlers = {}
+        self.batch_handlers = {}
     
     def register_handler(self, event_type, handler_func):
         """
@@ -27,6 +45,21 @@ class KafkaConsumer:
         """
         self.handlers[event_type] = handler_func
     
+    def register_batch_handler(self, event_type, handler_func):
+        """
+        Register a handler that receives consecutive events of a type from one
+        poll as a list
+        
+        Args:
+            event_type (str): The event type to handle
+            handler_func (callable): Called with a list of events, in offset order
+        
+        A batch ends at the first event of another type, so handlers still see
+        events of different types in offset order. Takes precedence over a
+        per-event handler for the same type.
+        """
+        self.batch_handlers[event_type] = handler_func
+    
     def subscribe(self, topics):
         """
         Subscribe to Kafka topics
@@ -62,32 +95,63 @@ class KafkaConsumer:
         """
         try:
             while self.running:
-                msg = self.consumer.poll(1.0)
-                
-                if msg is None:
-                    continue
-                
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        logger.info(f"Reached end of partition {msg.partition()}")
-                    else:
-                        logger.error(f"Error: {msg.error()}")
-                    continue
-                
-                try:
-                    value = json.loads(msg.value().decode('utf-8'))
-                    event_type = value.get('event_type')
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=self.batch_timeout)
+                if messages:
+                    self._dispatch(messages)
                     
-                    if event_type and event_type in self.handlers:
-                        self.handlers[event_type](value)
-                    else:
-                        logger.warning(f"No handler for event type: {event_type}")
-                        
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse message: {msg.value()}")
+        except Exception as e:
+            logger.error(f"Consumer error: {e}")
+            self.running = False
+    
+    def _dispatch(self, messages):
+        """
+        Run handlers in offset order. Consecutive events of a batch-handled
+        type are collected into one batch, which runs as soon as an event of
+        another type (or the end of the poll) is reached, so batching never
+        reorders events of different types.
+        """
+        batch_type, batch = None, []
+        for msg in messages:
+            if msg.error():
+                if msg.error().code() == KafkaError._PARTITION_EOF:
+                    logger.info(f"Reached end of partition {msg.partition()}")
+                else:
+                    logger.error(f"Error: {msg.error()}")
+                continue
+            
+            if msg.value() is None:
+                # Debezium tombstone (drop.tombstones=false) for log compaction;
+                # the delete itself arrived as the preceding op 'd' row
+                continue
+            
+            try:
+                value = decode_message(msg.value(), msg.headers())
+            except DeserializationError:
+                logger.error(f"Failed to parse message: {msg.value()}")
+                continue
+            event_type = event_type_of(value)
+            
+            if event_type != batch_type:
+                self._run_batch(batch_type, batch)
+                batch_type, batch = None, []
+            
+            if event_type in self.batch_handlers:
+                batch_type = event_type
+                batch.append(value)
+            elif event_type and event_type in self.handlers:
+                try:
+                    self.handlers[event_type](value)
                 except Exception as e:
                     logger.error(f"Error processing message: {e}")
-                    
+            else:
+                logger.warning(f"No handler for event type: {event_type}")
+        
+        self._run_batch(batch_type, batch)
+    
+    def _run_batch(self, event_type, events):
+        if not events:
+            return
+        try:
+            self.batch_handlers[event_type](events)
         except Exception as e:
-            logger.error(f"Consumer error: {e}")
-            self.running = False
\ No newline at end of file
+            logger.error(f"Error processing batch of {len(events)} {event_type} events: {e}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, Integer, String, Boolean
 from db import Base
 
 class User(Base):
@@ -10,3 +10,12 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
 
+class RevokedToken(Base):
+    """
+    Bearer tokens revoked by logout, kept until they would have expired
+    """
+    __tablename__ = "revoked_tokens"
+
+    digest = Column(String(64), primary_key=True)  # SHA-256 of the token
+    expires_at = Column(DateTime, nullable=False, index=True)
+
@@ -11,8 +11,7 @@ class UserRepository:
         hashed_pw = hash_password(user_data.password)
         new_user = User(username=user_data.username, email=user_data.email, hashed_password=hashed_pw)
         self.db.add(new_user)
-        self.db.commit()
-        self.db.refresh(new_user)
+        self.db.flush()
         return new_user
 
     def get_user_by_email(self, email: str):
@@ -3,26 +3,33 @@ from sqlalchemy.orm import Session
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from db import get_db
+from password_hasher import HasherOverloaded
 from .service import AuthService, get_current_user
 from .schemas import RegisterUser, LoginUser
 
 router = APIRouter()
 
 @router.post("/register")
-def register(user_data: RegisterUser, db: Session = Depends(get_db)):
+def register(user_data: RegisterUser, db: Session = Depends(get_db, scope="function")):
     auth_service = AuthService(db)
-    return auth_service.register_user(user_data)
+    try:
+        return auth_service.register_user(user_data)
+    except HasherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.post("/login")
-def login(request: Request, login_data: LoginUser, db: Session = Depends(get_db)):
+def login(request: Request, login_data: LoginUser, db: Session = Depends(get_db, scope="function")):
     auth_service = AuthService(db)
-    return auth_service.login_user(request, login_data)
+    try:
+        return auth_service.login_user(request, login_data)
+    except HasherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.get("/me")
 def get_profile(user: dict = Depends(get_current_user)):
     return JSONResponse(content={"username": user["username"], "email": user["email"]})
 
 @router.post("/logout")
-def logout(request: Request):
-    auth_service = AuthService(None)
+def logout(request: Request, db: Session = Depends(get_db, scope="function")):
+    auth_service = AuthService(db)
     return auth_service.logout_user(request)
\ No newline at end of file
@@ -1,9 +1,15 @@
-from passlib.context import CryptContext
+from password_hasher import get_password_hasher
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs in the shared process pool (see password_hasher.py)
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_password_hasher().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return get_password_hasher().verify(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    return await get_password_hasher().hash_async(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await get_password_hasher().verify_async(plain_password, hashed_password)
\ No newline at end of file
@@ -4,9 +4,11 @@ import logging
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
 
+from password_hasher import HasherOverloaded
 from .repository import UserRepository
 from .schemas import RegisterUser, LoginUser
 from .security import verify_password
+from .tokens import AUTH_MODE, issue_token, revoke_token, verify_token
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -47,6 +49,20 @@ class AuthService:
                 logger.debug("Password verification failed")
                 raise HTTPException(status_code=401, detail="Invalid email or password")
             
+            response = {
+                "message": "Login successful",
+                "user": {
+                    "email": user.email,
+                    "username": user.username
+                }
+            }
+
+            if AUTH_MODE == "token":
+                response["access_token"] = issue_token(user)
+                response["token_type"] = "bearer"
+                logger.debug("User successfully logged in and token issued")
+                return response
+
             # Store user info in session
             request.session["user"] = {
                 "id": user.id,
@@ -55,15 +71,9 @@ class AuthService:
             }
             logger.debug("User successfully logged in and session created")
             
-            return {
-                "message": "Login successful",
-                "user": {
-                    "email": user.email,
-                    "username": user.username
-                }
-            }
-        except HTTPException:
-            # Re-raise HTTP exceptions
+            return response
+        except (HTTPException, HasherOverloaded):
+            # Re-raise HTTP exceptions; an overloaded hasher is a 503 in the route
             raise
         except Exception as e:
             # Log the actual error
@@ -71,10 +81,28 @@ class AuthService:
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
     def logout_user(self, request: Request):
-        request.session.clear()
+        if AUTH_MODE == "token":
+            token = _bearer_token(request)
+            if token:
+                revoke_token(self.db, token)
+        else:
+            request.session.clear()
         return RedirectResponse(url="/", status_code=303)
 
+def _bearer_token(request: Request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
 def get_current_user(request: Request):
+    if AUTH_MODE == "token":
+        token = _bearer_token(request)
+        if not token:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        claims = verify_token(token)
+        return {"id": claims["sub"], "email": claims["email"], "username": claims["username"]}
+
     user = request.session.get("user")
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
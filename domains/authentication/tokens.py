@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from domains.authentication.models import RevokedToken
+from metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# "session" keeps the cookie-based SessionMiddleware; "token" uses signed bearer
+# tokens and skips the middleware, so anonymous requests do no crypto at all
+AUTH_MODE = os.getenv("AUTH_MODE", "session")
+TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", "900"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# How stale this process's copy of revoked_tokens may get (logouts elsewhere)
+TOKEN_DENYLIST_REFRESH_SECONDS = float(os.getenv("AUTH_TOKEN_DENYLIST_REFRESH_SECONDS", "5"))
+
+
+class TokenVerificationCache:
+    """
+    Bounded LRU of verified token claims, keyed by the token's SHA-256 digest
+    so raw tokens are never kept in memory
+    """
+    def __init__(self, max_size=TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, claims: dict, expires_at: float):
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class TokenDenylist:
+    """
+    Digests of revoked tokens until they expire.
+
+    Revocations are stored in revoked_tokens so every process sees them;
+    each process checks an in-memory copy, reloaded at most every
+    refresh_seconds, so verifying a token never waits on a query.
+    """
+    def __init__(self, session_factory=None, refresh_seconds=TOKEN_DENYLIST_REFRESH_SECONDS):
+        self._session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._entries = {}  # digest -> expires_at (epoch seconds)
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self.refreshes = 0
+
+    @property
+    def Session(self):
+        if self._session_factory is None:
+            from db import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def add(self, db, key: str, expires_at: float):
+        """
+        Record a revocation in the caller's transaction and in this process
+        """
+        expiry = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        db.execute(insert(RevokedToken).values(digest=key, expires_at=expiry).on_conflict_do_nothing())
+        with self._lock:
+            self._entries[key] = expires_at
+
+    def contains(self, key: str) -> bool:
+        now = time.time()
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+        with self._lock:
+            expires_at = self._entries.get(key)
+        return expires_at is not None and expires_at > now
+
+    def refresh(self):
+        # Claim the refresh first so concurrent requests don't all query
+        self._refreshed_at = time.monotonic()
+        try:
+            with self.Session() as session:
+                rows = session.execute(
+                    select(RevokedToken.digest, RevokedToken.expires_at)
+                    .where(RevokedToken.expires_at > datetime.utcnow())
+                ).all()
+        except Exception as e:
+            # Keep the last known list; retried after the next interval
+            logger.error(f"Token denylist refresh failed: {e}")
+            return
+        entries = {key: expires_at.replace(tzinfo=timezone.utc).timestamp() for key, expires_at in rows}
+        with self._lock:
+            # Keep local revocations the query may not see yet
+            now = time.time()
+            entries.update((key, expiry) for key, expiry in self._entries.items() if expiry > now and key not in entries)
+            self._entries = entries
+            self.refreshes += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "refreshes": self.refreshes}
+
+
+token_cache = TokenVerificationCache()
+register_collector("auth_tokens", token_cache.stats)
+token_denylist = TokenDenylist()
+register_collector("auth_token_denylist", token_denylist.stats)
+
+_serializer = None
+
+def _get_serializer():
+    # Built on first use so SECRET_KEY from .env (loaded by main) is picked up
+    global _serializer
+    if _serializer is None:
+        _serializer = URLSafeTimedSerializer(os.getenv("SECRET_KEY", "your_default_secret_key"), salt="auth-token")
+    return _serializer
+
+
+def issue_token(user) -> str:
+    """
+    Create a short-lived signed token carrying the user's claims
+    """
+    return _get_serializer().dumps({"sub": user.id, "email": user.email, "username": user.username})
+
+
+def verify_token(token: str) -> dict:
+    """
+    Return the claims of a valid, unrevoked token, raising 401 otherwise.
+    Repeat verifications of the same token are served from token_cache.
+    """
+    key = token_cache.digest(token)
+    if token_denylist.contains(key):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims, issued_at = _get_serializer().loads(token, max_age=TOKEN_TTL_SECONDS, return_timestamp=True)
+    except SignatureExpired:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except BadSignature:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    token_cache.put(key, claims, issued_at.timestamp() + TOKEN_TTL_SECONDS)
+    return claims
+
+
+def revoke_token(db, token: str):
+    """
+    Deny a valid token until it expires, for every process. The denial is
+    written in the caller's transaction.
+    """
+    try:
+        _, issued_at = _get_serializer().loads(token, max_age=TOKEN_TTL_SECONDS, return_timestamp=True)
+    except BadSignature:
+        return  # Expired or forged: already unusable
+    key = token_cache.digest(token)
+    token_denylist.add(db, key, issued_at.timestamp() + TOKEN_TTL_SECONDS)
+    token_cache.discard(key)
@@ -0,0 +1,229 @@
+"""
+Bulk customer import.
+
+Rows are validated, de-duplicated against the import and the database with
+one set-based query per batch, hashed across the password process pool and
+loaded with COPY. Bad rows are reported and skipped; they never abort the load.
+
+CLI:
+    python -m domains.customer.bulk_import customers.csv
+    python -m domains.customer.bulk_import customers.ndjson --format ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from db import engine
+from domains.customer.schemas import CustomerCreate
+from password_hasher import get_password_hasher
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_IMPORT_BATCH_SIZE = int(os.getenv("CUSTOMER_IMPORT_BATCH_SIZE", "2000"))
+
+
+def copy_csv(cursor, statement, buffer):
+    """
+    Run COPY ... FROM STDIN on a raw DBAPI cursor. SQLAlchemy 2.1 resolves
+    postgresql:// to psycopg 3 (cursor.copy); psycopg2 only has copy_expert.
+    """
+    if hasattr(cursor, "copy"):
+        with cursor.copy(statement) as copy:
+            copy.write(buffer.getvalue())
+    else:
+        cursor.copy_expert(statement, buffer)
+
+
+class RowParser:
+    """
+    Incremental CSV / NDJSON parser; feed it lines as they arrive.
+
+    CSV input needs a header line (name,email,contact_number,password) and
+    quoted fields may not span lines. Lines that can't be parsed come back as
+    the raw string so they are reported as failures.
+    """
+    def __init__(self, input_format="csv"):
+        if input_format not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported import format: {input_format}")
+        self.input_format = input_format
+        self.header = None
+        self.line_number = 0
+
+    def parse(self, lines):
+        rows = []
+        for line in lines:
+            self.line_number += 1
+            if not line.strip():
+                continue
+            if self.input_format == "ndjson":
+                try:
+                    rows.append((self.line_number, json.loads(line)))
+                except json.JSONDecodeError:
+                    rows.append((self.line_number, line))
+                continue
+            values = next(csv.reader([line]))
+            if self.header is None:
+                self.header = [column.strip() for column in values]
+                continue
+            rows.append((self.line_number, dict(zip(self.header, values))))
+        return rows
+
+
+class BulkImportResult:
+    def __init__(self):
+        self.received = 0
+        self.imported = 0
+        self.failures = []
+
+    def fail(self, row_number, email, error):
+        self.failures.append({"row": row_number, "email": email, "error": error})
+
+    def to_dict(self):
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": len(self.failures),
+            "failures": self.failures,
+        }
+
+
+class CustomerBulkImporter:
+    def __init__(self, db_engine=engine, hasher=None, batch_size=CUSTOMER_IMPORT_BATCH_SIZE):
+        self.engine = db_engine
+        self.hasher = hasher or get_password_hasher()
+        self.batch_size = batch_size
+        self.result = BulkImportResult()
+        self._seen_emails = set()
+
+    def import_rows(self, rows):
+        """
+        Import an iterable of (row_number, dict) in batches
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.load_batch(batch)
+                batch = []
+        if batch:
+            self.load_batch(batch)
+        return self.result
+
+    def import_file(self, path, input_format="csv"):
+        parser = RowParser(input_format)
+        with open(path, encoding="utf-8", newline="") as f:
+            return self.import_rows(row for line in f for row in parser.parse([line.rstrip("\r\n")]))
+
+    def _validate(self, batch):
+        valid = []
+        for row_number, data in batch:
+            self.result.received += 1
+            if not isinstance(data, dict):
+                self.result.fail(row_number, None, "Malformed row")
+                continue
+            try:
+                customer = CustomerCreate(**data)
+            except ValidationError as e:
+                email = data.get("email")
+                self.result.fail(row_number, email if isinstance(email, str) else None,
+                                 f"Invalid row: {e.errors()[0].get('msg')}")
+                continue
+            # EmailStr's normalized form is the one key for every duplicate
+            # check: in the import, against customers, and ON CONFLICT (email).
+            # Like registration and login it is case-sensitive in the local part.
+            if customer.email in self._seen_emails:
+                self.result.fail(row_number, customer.email, "Duplicate email in import")
+                continue
+            self._seen_emails.add(customer.email)
+            valid.append((row_number, customer))
+        return valid
+
+    def load_batch(self, batch):
+        """
+        Validate, de-duplicate, hash and COPY one batch in its own transaction
+        """
+        valid = self._validate(batch)
+        if not valid:
+            return
+
+        with self.engine.connect() as connection:
+            # One set-based duplicate check for the whole batch
+            existing = set(connection.execute(
+                text("SELECT email FROM customers WHERE email = ANY(:emails)"),
+                {"emails": [customer.email for _, customer in valid]}
+            ).scalars())
+        new_rows = []
+        for row_number, customer in valid:
+            if customer.email in existing:
+                self.result.fail(row_number, customer.email, "Email already registered")
+            else:
+                new_rows.append((row_number, customer))
+        if not new_rows:
+            return
+
+        hashed = self.hasher.hash_many(customer.password for _, customer in new_rows)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for (_, customer), hashed_password in zip(new_rows, hashed):
+            writer.writerow((customer.name, customer.email, customer.contact_number, hashed_password))
+        buffer.seek(0)
+
+        raw_connection = self.engine.raw_connection()
+        try:
+            cursor = raw_connection.cursor()
+            # COPY into a staging table, then insert with ON CONFLICT so a
+            # concurrent registration of the same email can't fail the batch
+            cursor.execute(
+                "CREATE TEMP TABLE customer_import "
+                "(name TEXT, email TEXT, contact_number TEXT, hashed_password TEXT) ON COMMIT DROP"
+            )
+            copy_csv(
+                cursor,
+                "COPY customer_import (name, email, contact_number, hashed_password) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            cursor.execute(
+                "INSERT INTO customers (name, email, contact_number, hashed_password, is_active) "
+                "SELECT name, email, contact_number, hashed_password, TRUE FROM customer_import "
+                "ON CONFLICT (email) DO NOTHING RETURNING email"
+            )
+            inserted = {row[0] for row in cursor.fetchall()}
+            raw_connection.commit()
+        except Exception as e:
+            raw_connection.rollback()
+            logger.error(f"Bulk customer batch failed: {e}")
+            for row_number, customer in new_rows:
+                self.result.fail(row_number, customer.email, "Batch failed to load")
+            return
+        finally:
+            raw_connection.close()
+
+        for row_number, customer in new_rows:
+            if customer.email in inserted:
+                self.result.imported += 1
+            else:
+                self.result.fail(row_number, customer.email, "Email already registered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import customers from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=CUSTOMER_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    input_format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    importer = CustomerBulkImporter(batch_size=args.batch_size)
+    result = importer.import_file(args.path, input_format)
+    print(json.dumps(result.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
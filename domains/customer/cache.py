@@ -0,0 +1,183 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from domains.customer.models import Customer
+from metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_CACHE_ENABLED = os.getenv("CUSTOMER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CUSTOMER_CACHE_SIZE = int(os.getenv("CUSTOMER_CACHE_SIZE", "50000"))
+# TTL bounds staleness if the CDC stream lags or is unavailable
+CUSTOMER_CACHE_TTL_SECONDS = float(os.getenv("CUSTOMER_CACHE_TTL_SECONDS", "300"))
+CUSTOMER_CDC_TOPIC = "ecommerce.public.customers"
+
+# Columns kept in the cache; the password hash deliberately is not
+CACHED_FIELDS = ("id", "name", "email", "contact_number", "is_active")
+
+
+class CustomerCache:
+    """
+    Read-through LRU/TTL cache of customer rows by id and by email.
+
+    Entries are plain column snapshots; reads hand back detached Customer
+    instances, so cached customers must only be used for reading.
+    """
+    def __init__(self, max_size=CUSTOMER_CACHE_SIZE, ttl=CUSTOMER_CACHE_TTL_SECONDS, enabled=CUSTOMER_CACHE_ENABLED):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._by_id = OrderedDict()   # id -> (snapshot, expires_at)
+        self._email_to_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _lookup(self, customer_id):
+        # Caller holds the lock
+        entry = self._by_id.get(customer_id)
+        if entry is None:
+            return None
+        snapshot, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(customer_id)
+            return None
+        self._by_id.move_to_end(customer_id)
+        return snapshot
+
+    def _remove(self, customer_id):
+        entry = self._by_id.pop(customer_id, None)
+        if entry is not None:
+            self._email_to_id.pop(entry[0]["email"], None)
+
+    def _hit_or_miss(self, snapshot):
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Customer(**snapshot)
+
+    def get_by_id(self, customer_id: int):
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._hit_or_miss(self._lookup(customer_id))
+
+    def get_by_email(self, email: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            customer_id = self._email_to_id.get(email)
+            snapshot = self._lookup(customer_id) if customer_id is not None else None
+            return self._hit_or_miss(snapshot)
+
+    def put(self, customer):
+        if not self.enabled or customer is None:
+            return
+        snapshot = {field: getattr(customer, field) for field in CACHED_FIELDS}
+        with self._lock:
+            self._remove(snapshot["id"])
+            self._by_id[snapshot["id"]] = (snapshot, time.monotonic() + self.ttl)
+            self._email_to_id[snapshot["email"]] = snapshot["id"]
+            while len(self._by_id) > self.max_size:
+                oldest_id = next(iter(self._by_id))
+                self._remove(oldest_id)
+
+    def invalidate(self, customer_id=None, email=None):
+        with self._lock:
+            if customer_id is None and email is not None:
+                customer_id = self._email_to_id.pop(email, None)
+            if customer_id is not None:
+                self._remove(customer_id)
+            self.invalidations += 1
+
+    def invalidate_from_cdc(self, event):
+        """
+        Drop the row referenced by a Debezium customers event
+        """
+        self.invalidate_from_cdc_batch([event])
+
+    def invalidate_from_cdc_batch(self, events):
+        """
+        Drop the rows referenced by a batch of Debezium customers events under one lock
+        """
+        keys = []
+        for event in events:
+            # Unwrapped rows (ExtractNewRecordState) carry the columns at the top
+            # level; deletes (delete.handling.mode=rewrite) carry at least the id
+            payload = event.get('payload') or event
+            customer_id = payload.get('id')
+            if customer_id is not None:
+                try:
+                    customer_id = int(customer_id)
+                except (TypeError, ValueError):
+                    pass
+            keys.append((customer_id, payload.get('email')))
+        with self._lock:
+            for customer_id, email in keys:
+                if customer_id is None and email is not None:
+                    customer_id = self._email_to_id.pop(email, None)
+                if customer_id is not None:
+                    self._remove(customer_id)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._email_to_id.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._by_id),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+
+customer_cache = CustomerCache()
+register_collector("customer_cache", customer_cache.stats)
+
+
+_invalidation_consumer = None
+
+def start_cache_invalidation(kafka_servers):
+    """
+    Follow the customers CDC topic from this process.
+
+    Every API process needs every invalidation, so each joins its own consumer
+    group and starts from the latest offset.
+    """
+    global _invalidation_consumer
+    if not customer_cache.enabled or _invalidation_consumer is not None:
+        return
+    from consumer import KafkaConsumer
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=kafka_servers,
+        group_id=f"customer_cache_{socket.gethostname()}_{os.getpid()}",
+        auto_offset_reset='latest'
+    )
+    consumer.subscribe([CUSTOMER_CDC_TOPIC])
+    for op in ('c', 'u', 'd'):
+        consumer.register_batch_handler(op, customer_cache.invalidate_from_cdc_batch)
+    consumer.start()
+    _invalidation_consumer = consumer
+    logger.info("Customer cache invalidation consumer started")
+
+def stop_cache_invalidation():
+    global _invalidation_consumer
+    if _invalidation_consumer is not None:
+        _invalidation_consumer.stop()
+        _invalidation_consumer = None
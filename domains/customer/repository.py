@@ -1,4 +1,8 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from db import after_commit
+from domains.customer.cache import customer_cache
 from domains.customer.models import Customer
 from domains.customer.schemas import CustomerUpdate
 from domains.customer.security import hash_password
@@ -8,13 +12,29 @@ class CustomerRepository:
         self.db = db
 
     def get_customer_by_id(self, customer_id: int):
-        return self.db.query(Customer).filter(Customer.id == customer_id).first()
+        """Cached read; the result may be detached, so don't modify it."""
+        customer = customer_cache.get_by_id(customer_id)
+        if customer is None:
+            customer = self._load_by_id(customer_id)
+            customer_cache.put(customer)
+        return customer
 
     def get_customer_by_email(self, email: str):
+        """Cached read; the result may be detached, so don't modify it."""
+        customer = customer_cache.get_by_email(email)
+        if customer is None:
+            customer = self._load_by_email(email)
+            customer_cache.put(customer)
+        return customer
+
+    def _load_by_id(self, customer_id: int):
+        return self.db.query(Customer).filter(Customer.id == customer_id).first()
+
+    def _load_by_email(self, email: str):
         return self.db.query(Customer).filter(Customer.email == email).first()
 
     def update_customer(self, customer_id: int, update_data: CustomerUpdate):
-        customer = self.get_customer_by_id(customer_id)
+        customer = self._load_by_id(customer_id)
 
         if not customer:
             return None
@@ -23,31 +43,98 @@ class CustomerRepository:
             customer.name = update_data.name
         if update_data.contact_number:
             customer.contact_number = update_data.contact_number
+        old_email = customer.email
         if update_data.email:
             customer.email = update_data.email
 
-        self.db.commit()
-        self.db.refresh(customer)
+        self.db.flush()
+        after_commit(self.db, lambda: customer_cache.invalidate(customer_id=customer_id, email=old_email))
         return customer
 
     def reset_password(self, email: str, new_password: str):
-        customer = self.get_customer_by_email(email)
+        customer = self._load_by_email(email)
 
         if not customer:
          return None
 
         customer.hashed_password = hash_password(new_password)  # ✅ Fixed field name
-        self.db.commit()
+        self.db.flush()
         return customer
 
 
 
     def deactivate_account(self, email: str):
-        customer = self.get_customer_by_email(email)
+        customer = self._load_by_email(email)
+
+        if not customer:
+            return None
+
+        customer.is_active = False  # Soft delete (Mark inactive)
+        self.db.flush()
+        customer_id = customer.id  # Read now; the instance is expired after commit
+        after_commit(self.db, lambda: customer_cache.invalidate(customer_id=customer_id))
+        return customer
+
+
+class AsyncCustomerRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_customer_by_id(self, customer_id: int):
+        """Cached read; the result may be detached, so don't modify it."""
+        customer = customer_cache.get_by_id(customer_id)
+        if customer is None:
+            customer = await self._load_by_id(customer_id)
+            customer_cache.put(customer)
+        return customer
+
+    async def get_customer_by_email(self, email: str):
+        """Cached read; the result may be detached, so don't modify it."""
+        customer = customer_cache.get_by_email(email)
+        if customer is None:
+            customer = await self._load_by_email(email)
+            customer_cache.put(customer)
+        return customer
+
+    async def _load_by_id(self, customer_id: int):
+        result = await self.db.execute(select(Customer).where(Customer.id == customer_id))
+        return result.scalars().first()
+
+    async def _load_by_email(self, email: str):
+        result = await self.db.execute(select(Customer).where(Customer.email == email))
+        return result.scalars().first()
+
+    async def create_customer(self, customer: Customer):
+        self.db.add(customer)
+        await self.db.flush()
+        return customer
+
+    async def update_customer(self, customer_id: int, update_data: CustomerUpdate):
+        customer = await self._load_by_id(customer_id)
+
+        if not customer:
+            return None
+
+        if update_data.name:
+            customer.name = update_data.name
+        if update_data.contact_number:
+            customer.contact_number = update_data.contact_number
+        old_email = customer.email
+        if update_data.email:
+            customer.email = update_data.email
+
+        await self.db.flush()
+        after_commit(self.db, lambda: customer_cache.invalidate(customer_id=customer_id, email=old_email))
+        return customer
+
+    async def deactivate_account(self, email: str):
+        customer = await self._load_by_email(email)
 
         if not customer:
             return None
 
         customer.is_active = False  # Soft delete (Mark inactive)
-        self.db.commit()
+        await self.db.flush()
+        customer_id = customer.id  # Read now; the instance is expired after commit
+        after_commit(self.db, lambda: customer_cache.invalidate(customer_id=customer_id))
         return customer
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+import codecs
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from domains.customer.models import Customer
-from .schemas import CustomerCreate, CustomerResponse, RegisterUser, CustomerCreateResponse
-from .service import CustomerService
-from db import get_db
+from .bulk_import import CustomerBulkImporter, RowParser
+from .schemas import CustomerCreate, CustomerResponse, RegisterUser, CustomerCreateResponse, CustomerBulkImportResponse
+from .service import AsyncCustomerService, CustomerService
+from db import get_async_db, get_db
+from password_hasher import HasherOverloaded
 
 router = APIRouter(
     prefix="/customer",
@@ -12,37 +16,76 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=CustomerCreateResponse)
-async def register_customer(user_data: RegisterUser, db: Session = Depends(get_db)):
-    service = CustomerService(db)
-    existing_customer = service.get_customer_by_email(user_data.email)
+async def register_customer(user_data: RegisterUser, db: AsyncSession = Depends(get_async_db, scope="function")):
+    service = AsyncCustomerService(db)
+    existing_customer = await service.get_customer_by_email(user_data.email)
     
     if existing_customer:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    created_customer = service.create_customer(user_data)
+    try:
+        created_customer = await service.create_customer(user_data)
+    except HasherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return CustomerCreateResponse(
         message="Customer registered successfully!",
         customer=created_customer
     )
 
 @router.post("/", response_model=CustomerCreateResponse)
-def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
+def create_customer(customer: CustomerCreate, db: Session = Depends(get_db, scope="function")):
     service = CustomerService(db)
     existing_customer = service.get_customer_by_email(customer.email)
 
     if existing_customer:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    created_customer = service.create_customer(customer)
+    try:
+        created_customer = service.create_customer(customer)
+    except HasherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return CustomerCreateResponse(
         message="Customer registered successfully!",
         customer=created_customer
     )
 
+@router.post("/bulk", response_model=CustomerBulkImportResponse)
+async def bulk_import_customers(request: Request, format: str | None = None):
+    """
+    Stream a CSV (with header) or NDJSON body of customers into the database.
+    Format comes from ?format= or the Content-Type; rows failing validation or
+    duplicating an email are reported without stopping the import.
+    """
+    content_type = request.headers.get("content-type", "")
+    input_format = format or ("ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv")
+    try:
+        parser = RowParser(input_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    importer = CustomerBulkImporter()
+    # Chunks can split multi-byte characters, so decode incrementally
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    rows = []
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        rows.extend(parser.parse(line.rstrip("\r") for line in lines))
+        if len(rows) >= importer.batch_size:
+            await run_in_threadpool(importer.import_rows, rows)
+            rows = []
+    pending += decoder.decode(b"", final=True)
+    rows.extend(parser.parse([pending.rstrip("\r")]))
+    if rows:
+        await run_in_threadpool(importer.import_rows, rows)
+
+    return importer.result.to_dict()
+
 @router.get("/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-    service = CustomerService(db)
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+async def get_customer(customer_id: int, db: AsyncSession = Depends(get_async_db, scope="function")):
+    service = AsyncCustomerService(db)
+    customer = await service.get_customer_by_id(customer_id)
 
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -41,3 +41,14 @@ class RegisterUser(BaseModel):
     email: EmailStr
     contact_number: str
     password: str
+
+class CustomerImportFailure(BaseModel):
+    row: int
+    email: str | None = None
+    error: str
+
+class CustomerBulkImportResponse(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    failures: list[CustomerImportFailure]
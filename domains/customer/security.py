@@ -1,11 +1,8 @@
-from passlib.context import CryptContext
-
-# Initialize password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from password_hasher import get_password_hasher
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using bcrypt
+    Hash a password using bcrypt in the shared hashing process pool
     
     Args:
         password: Plain text password
@@ -13,7 +10,7 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password string
     """
-    return pwd_context.hash(password)
+    return get_password_hasher().hash(password)
 
 # Alias for consistency with other parts of the code
 get_hashed_password = hash_password
@@ -29,4 +26,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         Boolean indicating if the password matches
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """
+    Awaitable hash_password for async routes
+    """
+    return await get_password_hasher().hash_async(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Awaitable verify_password for async routes
+    """
+    return await get_password_hasher().verify_async(plain_password, hashed_password)
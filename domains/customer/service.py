@@ -1,8 +1,9 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from domains.customer.repository import CustomerRepository
+from domains.customer.repository import AsyncCustomerRepository, CustomerRepository
 from domains.customer.schemas import CustomerUpdate, PasswordReset, CustomerCreate
 from .models import Customer
-from .security import get_hashed_password 
+from .security import get_hashed_password, hash_password_async
 
 class CustomerService:
     def __init__(self, db: Session):
@@ -13,7 +14,7 @@ class CustomerService:
         """
         Get a customer by their email address
         """
-        return self.db.query(Customer).filter(Customer.email == email).first()
+        return self.repo.get_customer_by_email(email)
 
     def create_customer(self, customer: CustomerCreate) -> Customer:
         """
@@ -28,7 +29,36 @@ class CustomerService:
         )
         
         self.db.add(db_customer)
-        self.db.commit()
-        self.db.refresh(db_customer)
+        self.db.flush()
         
-        return db_customer
\ No newline at end of file
+        return db_customer
+
+
+class AsyncCustomerService:
+    def __init__(self, db: AsyncSession):
+        self.repo = AsyncCustomerRepository(db)
+        self.db = db
+
+    async def get_customer_by_id(self, customer_id: int) -> Customer | None:
+        """
+        Get a customer by their id
+        """
+        return await self.repo.get_customer_by_id(customer_id)
+
+    async def get_customer_by_email(self, email: str) -> Customer | None:
+        """
+        Get a customer by their email address
+        """
+        return await self.repo.get_customer_by_email(email)
+
+    async def create_customer(self, customer: CustomerCreate) -> Customer:
+        """
+        Create a new customer
+        """
+        db_customer = Customer(
+            name=customer.name,
+            email=customer.email,
+            contact_number=customer.contact_number,
+            hashed_password=await hash_password_async(customer.password)
+        )
+        return await self.repo.create_customer(db_customer)
@@ -0,0 +1,202 @@
+"""
+In-memory availability index for fulfillment warehouse selection.
+
+Holds available quantity per (product, warehouse), built with one query over
+InventoryItem/Inventory and kept current from inventory events, so choosing
+warehouses for an order is a handful of dict lookups instead of a query per
+item. Every event process sees only its share of inventory_events
+partitions, so the index is also rebuilt every AVAILABILITY_INDEX_REFRESH_SECONDS
+on a background thread; plan() never waits on the database.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import select
+
+from domains.inventory.models import Inventory, InventoryItem
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_INDEX_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_INDEX_REFRESH_SECONDS", "60"))
+
+
+class FulfillmentPlan:
+    def __init__(self, allocations, unfulfilled):
+        self.allocations = allocations   # {warehouse_id: {product_id: quantity}}
+        self.unfulfilled = unfulfilled   # {product_id: quantity} no warehouse can supply
+
+    @property
+    def complete(self):
+        return not self.unfulfilled
+
+    @property
+    def split(self):
+        return len(self.allocations) > 1
+
+    def to_dict(self):
+        return {
+            "allocations": [
+                {"warehouse_id": warehouse_id, "items": [
+                    {"product_id": product_id, "quantity": quantity} for product_id, quantity in items.items()
+                ]}
+                for warehouse_id, items in self.allocations.items()
+            ],
+            "unfulfilled": [
+                {"product_id": product_id, "quantity": quantity} for product_id, quantity in self.unfulfilled.items()
+            ],
+        }
+
+
+class AvailabilityIndex:
+    def __init__(self, session_factory, refresh_seconds=AVAILABILITY_INDEX_REFRESH_SECONDS):
+        self.Session = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._items = {}                                  # item_id -> [product_id, warehouse_id, quantity]
+        self._available = defaultdict(dict)               # product_id -> {warehouse_id: quantity}
+        self._built_at = None
+        self._received = None                             # item_id -> quantity seen during a rebuild
+        self._stop = threading.Event()
+        self._thread = None
+        self.rebuilds = 0
+
+    # --- maintenance --------------------------------------------------------
+
+    def rebuild(self):
+        """
+        Replace the index with a fresh snapshot. Quantities from events that
+        arrive while the snapshot is read are applied on top of it before the
+        swap, so they aren't lost to the (possibly older) snapshot.
+        """
+        with self._lock:
+            self._received = {}
+        try:
+            with self.Session() as session:
+                rows = session.execute(
+                    select(InventoryItem.id, InventoryItem.product_id, Inventory.warehouse_id, InventoryItem.quantity)
+                    .join(Inventory, Inventory.id == InventoryItem.inventory_id)
+                ).all()
+        except Exception:
+            with self._lock:
+                self._received = None
+            raise
+
+        items = {item_id: [product_id, warehouse_id, quantity] for item_id, product_id, warehouse_id, quantity in rows}
+
+        with self._lock:
+            for item_id, quantity in self._received.items():
+                if item_id in items:
+                    items[item_id][2] = quantity
+            self._received = None
+
+            available = defaultdict(dict)
+            for product_id, warehouse_id, quantity in items.values():
+                if warehouse_id is not None:
+                    by_warehouse = available[product_id]
+                    by_warehouse[warehouse_id] = by_warehouse.get(warehouse_id, 0) + quantity
+            self._items = items
+            self._available = available
+            self._built_at = time.monotonic()
+            self.rebuilds += 1
+        logger.info(f"Availability index built from {len(items)} inventory items")
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f"Availability index rebuild failed, keeping the previous one: {e}")
+
+    def start(self):
+        """
+        Build the index now and refresh it in the background
+        """
+        if self._thread is None:
+            self.rebuild()
+            self._thread = threading.Thread(target=self._run, name="availability-index", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def set_item_quantity(self, item_id, quantity):
+        """
+        Apply an absolute quantity for one inventory item (from an event)
+        """
+        with self._lock:
+            if self._received is not None:
+                self._received[item_id] = quantity
+            item = self._items.get(item_id)
+            if item is None:
+                # New item; picked up with its warehouse on the next rebuild
+                return False
+            product_id, warehouse_id, old_quantity = item
+            item[2] = quantity
+            if warehouse_id is not None:
+                by_warehouse = self._available[product_id]
+                by_warehouse[warehouse_id] = by_warehouse.get(warehouse_id, 0) + quantity - old_quantity
+            return True
+
+    # --- selection ----------------------------------------------------------
+
+    def plan(self, demand):
+        """
+        Choose warehouses for {product_id: quantity}.
+
+        A single warehouse that can ship everything wins (the one with the most
+        stock of the ordered products, to keep stock balanced). Otherwise
+        warehouses are picked greedily by how many of the remaining units they
+        cover, which keeps the number of shipments low.
+        """
+        if self._built_at is None:
+            # Only without start(): build once rather than plan from nothing
+            self.rebuild()
+        remaining = {product_id: quantity for product_id, quantity in demand.items() if quantity > 0}
+
+        with self._lock:
+            stock = {product_id: dict(self._available.get(product_id, {})) for product_id in remaining}
+
+        single = None
+        candidates = set.intersection(*(set(w) for w in stock.values())) if stock else set()
+        for warehouse_id in candidates:
+            if all(stock[p].get(warehouse_id, 0) >= q for p, q in remaining.items()):
+                total = sum(stock[p][warehouse_id] for p in remaining)
+                if single is None or total > single[1] or (total == single[1] and warehouse_id < single[0]):
+                    single = (warehouse_id, total)
+        if single is not None:
+            return FulfillmentPlan({single[0]: dict(remaining)}, {})
+
+        allocations = {}
+        while remaining:
+            coverage = defaultdict(int)
+            for product_id, quantity in remaining.items():
+                for warehouse_id, available in stock[product_id].items():
+                    if warehouse_id not in allocations and available > 0:
+                        coverage[warehouse_id] += min(quantity, available)
+            if not coverage:
+                break
+            warehouse_id = max(coverage, key=lambda w: (coverage[w], -w))
+            picked = {}
+            for product_id in list(remaining):
+                take = min(remaining[product_id], stock[product_id].get(warehouse_id, 0))
+                if take > 0:
+                    picked[product_id] = take
+                    remaining[product_id] -= take
+                    if not remaining[product_id]:
+                        del remaining[product_id]
+            allocations[warehouse_id] = picked
+
+        return FulfillmentPlan(allocations, remaining)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "products": len(self._available),
+                "age_seconds": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+                "rebuilds": self.rebuilds,
+            }
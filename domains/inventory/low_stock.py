@@ -0,0 +1,138 @@
+"""
+Low-stock alerting.
+
+Every stock observation is checked against the item's low_stock_threshold
+(LOW_STOCK_DEFAULT_THRESHOLD when unset). Items below it are collected for
+the current window and published together as one low_stock_alerts event when
+the window closes; an item that alerted is not reported again until a full
+window has passed since its last alert.
+"""
+import logging
+import os
+import threading
+import time
+from sqlalchemy import select
+
+from domains.inventory.models import InventoryItem
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_DEFAULT_THRESHOLD = int(os.getenv("LOW_STOCK_DEFAULT_THRESHOLD", "10"))
+LOW_STOCK_ALERT_WINDOW_SECONDS = float(os.getenv("LOW_STOCK_ALERT_WINDOW_SECONDS", "60"))
+LOW_STOCK_THRESHOLD_REFRESH_SECONDS = float(os.getenv("LOW_STOCK_THRESHOLD_REFRESH_SECONDS", "300"))
+
+
+class LowStockMonitor:
+    def __init__(self, session_factory, kafka_producer=None, window_seconds=LOW_STOCK_ALERT_WINDOW_SECONDS,
+                 default_threshold=LOW_STOCK_DEFAULT_THRESHOLD, refresh_seconds=LOW_STOCK_THRESHOLD_REFRESH_SECONDS):
+        self.Session = session_factory
+        self.kafka_producer = kafka_producer
+        self.window_seconds = window_seconds
+        self.default_threshold = default_threshold
+        self.refresh_seconds = refresh_seconds
+
+        self._lock = threading.Lock()
+        self._thresholds = {}      # item_id -> threshold, only items that override the default
+        self._thresholds_at = None
+        self._pending = {}         # item_id -> alert, for the current window
+        self._last_alert = {}      # item_id -> monotonic time of its last published alert
+        self._stop = threading.Event()
+        self._thread = None
+        self.observed = 0
+        self.suppressed = 0
+        self.batches = 0
+
+    def _load_thresholds(self):
+        with self.Session() as session:
+            rows = session.execute(
+                select(InventoryItem.id, InventoryItem.low_stock_threshold)
+                .where(InventoryItem.low_stock_threshold.isnot(None))
+            ).all()
+        self._thresholds = dict(rows)
+        self._thresholds_at = time.monotonic()
+
+    def threshold_for(self, item_id):
+        if self._thresholds_at is None or time.monotonic() - self._thresholds_at > self.refresh_seconds:
+            self._load_thresholds()
+        return self._thresholds.get(item_id, self.default_threshold)
+
+    def observe(self, item_id, quantity, product_id=None):
+        """
+        Record a stock level; returns True if the item is (or stays) queued for alerting
+        """
+        threshold = self.threshold_for(item_id)
+        with self._lock:
+            self.observed += 1
+            if quantity >= threshold:
+                # Recovered before the window closed; nothing to report
+                self._pending.pop(item_id, None)
+                return False
+            last = self._last_alert.get(item_id)
+            if last is not None and time.monotonic() - last < self.window_seconds:
+                self.suppressed += 1
+                return False
+            if item_id in self._pending:
+                self.suppressed += 1
+            self._pending[item_id] = {
+                'item_id': item_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'threshold': threshold,
+            }
+            return True
+
+    def flush(self):
+        """
+        Publish everything queued in this window as one low_stock_alerts event
+        """
+        with self._lock:
+            alerts = list(self._pending.values())
+            self._pending = {}
+            now = time.monotonic()
+            for alert in alerts:
+                self._last_alert[alert['item_id']] = now
+            # Forget items whose suppression has expired
+            self._last_alert = {
+                item_id: at for item_id, at in self._last_alert.items() if now - at < self.window_seconds
+            }
+        if not alerts:
+            return 0
+
+        self.batches += 1
+        logger.warning(f"LOW STOCK ALERT: {len(alerts)} items below threshold: "
+                       f"{[(alert['item_id'], alert['quantity']) for alert in alerts[:20]]}")
+        if self.kafka_producer:
+            self.kafka_producer.publish_event(
+                topic='inventory_events',
+                event_type='low_stock_alerts',
+                payload={'window_seconds': self.window_seconds, 'items': alerts},
+            )
+        return len(alerts)
+
+    def _run(self):
+        while not self._stop.wait(self.window_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to publish low stock alerts: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="low-stock-alerts", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'observed': self.observed,
+                'suppressed': self.suppressed,
+                'batches': self.batches,
+                'pending': len(self._pending),
+                'items_with_thresholds': len(self._thresholds),
+            }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Float, Integer, ForeignKey, String, Enum
+from sqlalchemy import BigInteger, Column, Float, Integer, ForeignKey, String, Enum
 from sqlalchemy.orm import relationship
 from db import Base  # Ensure this imports your declarative Base
 import enum
@@ -38,6 +38,7 @@ class InventoryItem(Base):
     product_id = Column(Integer, nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=True)  # Add this field
+    low_stock_threshold = Column(Integer, nullable=True)  # None uses LOW_STOCK_DEFAULT_THRESHOLD
     
     inventory = relationship("Inventory", back_populates="items")
     stock_levels = relationship("StockLevel", back_populates="item")
@@ -56,7 +57,16 @@ class ReplenishmentOrder(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     inventory_id = Column(Integer, ForeignKey("inventory.id", ondelete="CASCADE"))
+    item_id = Column(Integer, ForeignKey("inventory_items.id", ondelete="CASCADE"), nullable=True, index=True)
     quantity = Column(Integer, nullable=False)
     status = Column(Enum(OrderStatusEnum), default=OrderStatusEnum.PENDING)
     
-    inventory = relationship("Inventory", back_populates="replenishment_orders")
\ No newline at end of file
+    inventory = relationship("Inventory", back_populates="replenishment_orders")
+
+class StockLedgerCheckpoint(Base):
+    __tablename__ = "stock_ledger_checkpoints"
+    
+    # Last hot-SKU ledger log sequence applied to inventory_items/stock_levels,
+    # written in the same transaction as the flushed deltas
+    ledger_id = Column(String, primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
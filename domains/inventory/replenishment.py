@@ -0,0 +1,191 @@
+"""
+Replenishment planning job.
+
+Loads every inventory item's stock, open replenishment quantity and recent
+demand into NumPy arrays, computes reorder points and order quantities in
+one vectorized pass and bulk-inserts the resulting ReplenishmentOrders.
+
+Orders carry no timestamps, so demand is measured over the most recent
+REPLENISHMENT_DEMAND_ORDER_ITEMS order lines (the "demand window"), and lead
+time and cover are expressed in demand windows. A product's demand is split
+evenly across the inventory items (warehouses) that stock it.
+
+    reorder_point = demand * lead_time + z * sqrt(demand * lead_time)
+    order_up_to   = reorder_point + demand * cover
+    quantity      = order_up_to - (stock + on_order)   when stock + on_order <= reorder_point
+
+CLI:
+    python -m domains.inventory.replenishment
+    python -m domains.inventory.replenishment --dry-run
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from db import SessionLocal
+from domains.inventory.models import InventoryItem, OrderStatusEnum, ReplenishmentOrder
+from domains.order.models import OrderItem
+
+logger = logging.getLogger(__name__)
+
+REPLENISHMENT_DEMAND_ORDER_ITEMS = int(os.getenv("REPLENISHMENT_DEMAND_ORDER_ITEMS", "1000000"))
+REPLENISHMENT_LEAD_TIME = float(os.getenv("REPLENISHMENT_LEAD_TIME", "0.25"))
+REPLENISHMENT_COVER = float(os.getenv("REPLENISHMENT_COVER", "1.0"))
+REPLENISHMENT_SERVICE_Z = float(os.getenv("REPLENISHMENT_SERVICE_Z", "1.65"))  # ~95% service level
+REPLENISHMENT_INSERT_BATCH_SIZE = int(os.getenv("REPLENISHMENT_INSERT_BATCH_SIZE", "10000"))
+
+# Replenishment orders that still count as incoming stock
+OPEN_STATUSES = (OrderStatusEnum.PENDING, OrderStatusEnum.CONFIRMED, OrderStatusEnum.SHIPPED)
+
+
+class ReplenishmentPlan:
+    def __init__(self, item_ids, inventory_ids, quantities, reorder_points):
+        self.item_ids = item_ids
+        self.inventory_ids = inventory_ids
+        self.quantities = quantities
+        self.reorder_points = reorder_points
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def rows(self):
+        return [
+            {
+                "item_id": item_id,
+                "inventory_id": inventory_id if inventory_id >= 0 else None,
+                "quantity": quantity,
+                "status": OrderStatusEnum.PENDING,
+            }
+            for item_id, inventory_id, quantity in zip(
+                self.item_ids.tolist(), self.inventory_ids.tolist(), self.quantities.tolist()
+            )
+        ]
+
+
+def _column(rows, index, dtype, fill=None):
+    if fill is not None:
+        return np.fromiter((fill if row[index] is None else row[index] for row in rows), dtype=dtype, count=len(rows))
+    return np.fromiter((row[index] for row in rows), dtype=dtype, count=len(rows))
+
+
+class ReplenishmentPlanner:
+    def __init__(self, session_factory=SessionLocal, demand_order_items=REPLENISHMENT_DEMAND_ORDER_ITEMS,
+                 lead_time=REPLENISHMENT_LEAD_TIME, cover=REPLENISHMENT_COVER, service_z=REPLENISHMENT_SERVICE_Z):
+        self.Session = session_factory
+        self.demand_order_items = demand_order_items
+        self.lead_time = lead_time
+        self.cover = cover
+        self.service_z = service_z
+
+    def _load(self, session):
+        """
+        Three set-based queries: items, open replenishment per item and
+        demand per product (aggregated in the database)
+        """
+        items = session.execute(
+            select(InventoryItem.id, InventoryItem.inventory_id, InventoryItem.product_id, InventoryItem.quantity)
+            .order_by(InventoryItem.id)
+        ).all()
+
+        on_order = session.execute(
+            select(ReplenishmentOrder.item_id, func.sum(ReplenishmentOrder.quantity))
+            .where(ReplenishmentOrder.item_id.isnot(None), ReplenishmentOrder.status.in_(OPEN_STATUSES))
+            .group_by(ReplenishmentOrder.item_id)
+        ).all()
+
+        recent = (
+            select(OrderItem.product_id, OrderItem.quantity)
+            .order_by(OrderItem.id.desc())
+            .limit(self.demand_order_items)
+            .subquery()
+        )
+        demand = session.execute(
+            select(recent.c.product_id, func.sum(recent.c.quantity)).group_by(recent.c.product_id)
+        ).all()
+        return items, on_order, demand
+
+    def plan(self, items, on_order, demand):
+        item_ids = _column(items, 0, np.int64)
+        inventory_ids = _column(items, 1, np.int64, fill=-1)  # -1: item without an inventory
+        product_ids = _column(items, 2, np.int64)
+        stock = _column(items, 3, np.float64)
+
+        # Incoming stock per item, aligned to item_ids (which are sorted)
+        incoming = np.zeros(len(item_ids))
+        if on_order and len(item_ids):
+            order_item_ids = _column(on_order, 0, np.int64)
+            positions = np.searchsorted(item_ids, order_item_ids)
+            known = (positions < len(item_ids)) & (item_ids[np.minimum(positions, len(item_ids) - 1)] == order_item_ids)
+            np.add.at(incoming, positions[known], _column(on_order, 1, np.float64)[known])
+
+        # Product demand, split evenly across the items stocking the product
+        item_demand = np.zeros(len(item_ids))
+        if demand and len(item_ids):
+            demand_products = _column(demand, 0, np.int64)
+            demand_units = _column(demand, 1, np.float64)
+            order = np.argsort(demand_products)
+            demand_products, demand_units = demand_products[order], demand_units[order]
+            positions = np.searchsorted(demand_products, product_ids)
+            matched = (positions < len(demand_products)) & (
+                demand_products[np.minimum(positions, len(demand_products) - 1)] == product_ids
+            )
+            _, inverse, items_per_product = np.unique(product_ids, return_inverse=True, return_counts=True)
+            item_demand[matched] = demand_units[positions[matched]] / items_per_product[inverse][matched]
+
+        lead_demand = item_demand * self.lead_time
+        reorder_points = lead_demand + self.service_z * np.sqrt(lead_demand)
+        order_up_to = reorder_points + item_demand * self.cover
+        position = stock + incoming
+        needs_order = (item_demand > 0) & (position <= reorder_points)
+        quantities = np.ceil(order_up_to - position).astype(np.int64)
+        selected = needs_order & (quantities > 0)
+
+        return ReplenishmentPlan(
+            item_ids[selected], inventory_ids[selected], quantities[selected], reorder_points[selected]
+        )
+
+    def run(self, dry_run=False):
+        started = time.perf_counter()
+        with self.Session() as session:
+            items, on_order, demand = self._load(session)
+            loaded = time.perf_counter()
+            plan = self.plan(items, on_order, demand)
+            planned = time.perf_counter()
+
+            if not dry_run and len(plan):
+                rows = plan.rows()
+                for start in range(0, len(rows), REPLENISHMENT_INSERT_BATCH_SIZE):
+                    session.execute(insert(ReplenishmentOrder), rows[start:start + REPLENISHMENT_INSERT_BATCH_SIZE])
+                session.commit()
+        finished = time.perf_counter()
+
+        summary = {
+            "items": len(items),
+            "orders": len(plan),
+            "units": int(plan.quantities.sum()) if len(plan) else 0,
+            "dry_run": dry_run,
+            "load_seconds": round(loaded - started, 3),
+            "plan_seconds": round(planned - loaded, 3),
+            "insert_seconds": round(finished - planned, 3),
+        }
+        logger.info(f"Replenishment plan: {summary}")
+        return plan, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create replenishment orders for items at or below their reorder point")
+    parser.add_argument("--dry-run", action="store_true", help="plan only, don't insert orders")
+    parser.add_argument("--demand-order-items", type=int, default=REPLENISHMENT_DEMAND_ORDER_ITEMS)
+    args = parser.parse_args()
+
+    planner = ReplenishmentPlanner(demand_order_items=args.demand_order_items)
+    _, summary = planner.run(dry_run=args.dry_run)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,30 @@
-from sqlalchemy.orm import Session
-from domains.inventory.models import Inventory
+from sqlalchemy import Integer, column, insert, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from domains.inventory.models import Inventory, InventoryItem, StockLevel
+
+# Catalog rows are read as plain column tuples, never as ORM objects
+CATALOG_COLUMNS = (
+    InventoryItem.id,
+    InventoryItem.product_id,
+    InventoryItem.inventory_id,
+    Inventory.warehouse_id,
+    InventoryItem.quantity,
+    InventoryItem.price,
+)
+
+def catalog_query(warehouse_id: int = None, min_price: float = None, max_price: float = None):
+    """
+    Product catalog rows in item id order, optionally filtered
+    """
+    query = select(*CATALOG_COLUMNS).join(Inventory, Inventory.id == InventoryItem.inventory_id)
+    if warehouse_id is not None:
+        query = query.where(Inventory.warehouse_id == warehouse_id)
+    if min_price is not None:
+        query = query.where(InventoryItem.price >= min_price)
+    if max_price is not None:
+        query = query.where(InventoryItem.price <= max_price)
+    return query.order_by(InventoryItem.id)
 
 class InventoryRepository:
     def __init__(self, db: Session):
@@ -7,8 +32,7 @@ class InventoryRepository:
     
     def create_inventory(self, inventory: Inventory):
         self.db.add(inventory)
-        self.db.commit()
-        self.db.refresh(inventory)
+        self.db.flush()
         return inventory
     
     def get_inventory(self, inventory_id: int):
@@ -19,12 +43,98 @@ class InventoryRepository:
         if inventory:
             for key, value in inventory_data.items():
                 setattr(inventory, key, value)
-            self.db.commit()
+            self.db.flush()
         return inventory
     
     def delete_inventory(self, inventory_id: int):
         inventory = self.get_inventory(inventory_id)
         if inventory:
             self.db.delete(inventory)
-            self.db.commit()
+            self.db.flush()
+        return inventory
+    
+    def set_stock_levels(self, quantities: dict):
+        """
+        Set many items' stock with one UPDATE ... FROM (VALUES ...) per table.
+        Returns [(item_id, product_id, quantity)] for the items that exist.
+        """
+        rows = sorted(quantities.items())
+        # Lock in item id order first: the UPDATE's join order is the planner's,
+        # so overlapping snapshots (and reservations) could otherwise deadlock
+        self.db.execute(
+            select(InventoryItem.id)
+            .where(InventoryItem.id.in_([item_id for item_id, _ in rows]))
+            .order_by(InventoryItem.id)
+            .with_for_update()
+        ).all()
+        snapshot = values(column("item_id", Integer), column("quantity", Integer), name="snapshot").data(rows)
+        updated = self.db.execute(
+            update(InventoryItem.__table__)
+            .where(InventoryItem.id == snapshot.c.item_id)
+            .values(quantity=snapshot.c.quantity)
+            .returning(InventoryItem.id, InventoryItem.product_id, InventoryItem.quantity)
+        ).all()
+        if updated:
+            with_levels = set(self.db.execute(
+                update(StockLevel.__table__)
+                .where(StockLevel.item_id == snapshot.c.item_id)
+                .values(quantity=snapshot.c.quantity)
+                .returning(StockLevel.item_id)
+            ).scalars())
+            # Items created without a stock_levels row get one, as in the single-item update
+            missing = [{"item_id": item_id, "quantity": quantity}
+                       for item_id, _, quantity in updated if item_id not in with_levels]
+            if missing:
+                self.db.execute(insert(StockLevel.__table__), missing)
+        return updated
+    
+    def get_catalog_page(self, limit: int, after_id: int = None, **filters):
+        """
+        One keyset page of the catalog. Fetches limit + 1 rows so the caller
+        can tell whether another page exists.
+        """
+        query = catalog_query(**filters)
+        if after_id is not None:
+            query = query.where(InventoryItem.id > after_id)
+        return self.db.execute(query.limit(limit + 1)).mappings().all()
+    
+    def stream_catalog(self, batch_size: int, **filters):
+        """
+        Yield the whole (filtered) catalog in partitions of batch_size rows
+        from a server-side cursor
+        """
+        result = self.db.execute(catalog_query(**filters).execution_options(yield_per=batch_size))
+        for partition in result.mappings().partitions():
+            yield partition
+
+
+class AsyncInventoryRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_inventory(self, inventory: Inventory):
+        self.db.add(inventory)
+        await self.db.flush()
+        return await self.get_inventory(inventory.id)
+
+    async def get_inventory(self, inventory_id: int):
+        # InventorySchema serializes items, so load them with the inventory
+        result = await self.db.execute(
+            select(Inventory).options(selectinload(Inventory.items)).where(Inventory.id == inventory_id)
+        )
+        return result.scalars().first()
+
+    async def update_inventory(self, inventory_id: int, inventory_data: dict):
+        inventory = await self.get_inventory(inventory_id)
+        if inventory:
+            for key, value in inventory_data.items():
+                setattr(inventory, key, value)
+            await self.db.flush()
+        return inventory
+
+    async def delete_inventory(self, inventory_id: int):
+        inventory = await self.get_inventory(inventory_id)
+        if inventory:
+            await self.db.delete(inventory)
+            await self.db.flush()
         return inventory
@@ -0,0 +1,163 @@
+import logging
+from collections import defaultdict
+from sqlalchemy import Integer, column, select, update, values
+
+from domains.inventory.models import InventoryItem, StockLevel
+
+logger = logging.getLogger(__name__)
+
+inventory_items = InventoryItem.__table__
+stock_levels = StockLevel.__table__
+
+
+class InventoryReservationEngine:
+    """
+    Reserves stock for batches of reserve_inventory commands in one transaction.
+
+    Quantities are only ever decremented by conditional UPDATEs
+    (quantity >= requested), never read-modify-written. Rows are locked in
+    item id order first, so concurrent batches can't deadlock each other.
+
+    Hot items held by a stock ledger are reserved in memory instead and
+    written behind by the ledger.
+    """
+    def __init__(self, session_factory, ledger=None):
+        self.Session = session_factory
+        self.ledger = ledger
+
+    def reserve_batch(self, commands):
+        """
+        Reserve a batch of commands ({'order_id', 'item_id' or 'product_id', 'quantity'}).
+
+        Returns one result dict per command, in input order, with status
+        'reserved' or 'failed' (and a reason for failures).
+        """
+        results = [None] * len(commands)
+
+        with self.Session.begin() as session:
+            resolved = self._resolve_items(session, commands)
+
+            # item_id -> [(command index, quantity)] in arrival order
+            requests = defaultdict(list)
+            for index, command in enumerate(commands):
+                item_id = resolved[index]
+                quantity = command.get('quantity')
+                if item_id is None:
+                    results[index] = self._result(command, None, 'failed', 'unknown_item')
+                elif not isinstance(quantity, int) or quantity <= 0:
+                    results[index] = self._result(command, item_id, 'failed', 'invalid_quantity')
+                elif self.ledger and self.ledger.is_hot(item_id):
+                    results[index] = self._reserve_hot(command, item_id, quantity)
+                else:
+                    requests[item_id].append((index, quantity))
+
+            if requests:
+                item_ids = sorted(requests)
+                locked = set(session.execute(
+                    select(inventory_items.c.id)
+                    .where(inventory_items.c.id.in_(item_ids))
+                    .order_by(inventory_items.c.id)
+                    .with_for_update()
+                ).scalars())
+
+                reserved_totals = {}
+                # Fast path: one conditional UPDATE for every item's total demand
+                totals = [(item_id, sum(q for _, q in requests[item_id])) for item_id in item_ids if item_id in locked]
+                if totals:
+                    total_by_item = dict(totals)
+                    rows = self._decrement(session, totals)
+                    for item_id, quantity_left in rows:
+                        reserved_totals[item_id] = total_by_item[item_id]
+                        for index, quantity in requests[item_id]:
+                            results[index] = self._result(commands[index], item_id, 'reserved', remaining=quantity_left)
+
+                # Slow path: items whose total didn't fit are reserved command by
+                # command, first come first served, until stock runs out
+                for item_id in item_ids:
+                    if item_id not in locked:
+                        for index, _ in requests[item_id]:
+                            results[index] = self._result(commands[index], item_id, 'failed', 'unknown_item')
+                        continue
+                    if item_id in reserved_totals:
+                        continue
+                    for index, quantity in requests[item_id]:
+                        rows = self._decrement(session, [(item_id, quantity)])
+                        if rows:
+                            reserved_totals[item_id] = reserved_totals.get(item_id, 0) + quantity
+                            results[index] = self._result(commands[index], item_id, 'reserved', remaining=rows[0][1])
+                        else:
+                            results[index] = self._result(commands[index], item_id, 'failed', 'insufficient_stock')
+
+                if reserved_totals:
+                    self._decrement_stock_levels(session, sorted(reserved_totals.items()))
+
+        reserved = sum(1 for result in results if result['status'] == 'reserved')
+        logger.info(f"Reservation batch: {reserved}/{len(commands)} commands reserved")
+        return results
+
+    def _reserve_hot(self, command, item_id, quantity):
+        try:
+            remaining = self.ledger.try_reserve(item_id, quantity)
+        except ValueError:
+            return self._result(command, item_id, 'failed', 'unknown_item')
+        if remaining is None:
+            return self._result(command, item_id, 'failed', 'insufficient_stock')
+        return self._result(command, item_id, 'reserved', remaining=remaining)
+
+    def _resolve_items(self, session, commands):
+        """
+        Map each command to an inventory item id. Commands that only name a
+        product are served from that product's best-stocked item.
+        """
+        resolved = [command.get('item_id') for command in commands]
+        product_ids = {command.get('product_id') for command, item_id in zip(commands, resolved)
+                       if item_id is None and command.get('product_id') is not None}
+        if product_ids:
+            best_items = dict(session.execute(
+                select(inventory_items.c.product_id, inventory_items.c.id)
+                .where(inventory_items.c.product_id.in_(product_ids))
+                .distinct(inventory_items.c.product_id)
+                .order_by(inventory_items.c.product_id, inventory_items.c.quantity.desc())
+            ).all())
+            resolved = [
+                item_id if item_id is not None else best_items.get(command.get('product_id'))
+                for command, item_id in zip(commands, resolved)
+            ]
+        return resolved
+
+    @staticmethod
+    def _decrement(session, totals):
+        """
+        UPDATE ... FROM (VALUES ...) that only succeeds for rows with enough stock.
+        Returns [(item_id, remaining quantity)] for the rows that were decremented.
+        """
+        requested = values(column('id', Integer), column('qty', Integer), name='requested').data(totals)
+        return session.execute(
+            update(inventory_items)
+            .where(inventory_items.c.id == requested.c.id, inventory_items.c.quantity >= requested.c.qty)
+            .values(quantity=inventory_items.c.quantity - requested.c.qty)
+            .returning(inventory_items.c.id, inventory_items.c.quantity)
+        ).all()
+
+    @staticmethod
+    def _decrement_stock_levels(session, totals):
+        reserved = values(column('item_id', Integer), column('qty', Integer), name='reserved').data(totals)
+        session.execute(
+            update(stock_levels)
+            .where(stock_levels.c.item_id == reserved.c.item_id)
+            .values(quantity=stock_levels.c.quantity - reserved.c.qty)
+        )
+
+    @staticmethod
+    def _result(command, item_id, status, reason=None, remaining=None):
+        result = {
+            'order_id': command.get('order_id'),
+            'item_id': item_id,
+            'quantity': command.get('quantity'),
+            'status': status,
+        }
+        if reason:
+            result['reason'] = reason
+        if remaining is not None:
+            result['remaining'] = remaining
+        return result
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from domains.inventory.models import InventoryItem, StockLevel
-from domains.inventory.service import InventoryService, WarehouseService
-from domains.inventory.schemas import InventoryCreate, InventoryItemCreate, InventoryItemSchema, InventorySchema, InventoryUpdate, ReplenishmentOrderCreate, ReplenishmentOrderSchema, StockUpdateSchema, WarehouseCreate, WarehouseSchema, WarehouseUpdate
+from domains.inventory.service import AsyncInventoryService, InventoryService, WarehouseService
+from domains.inventory.schemas import InventoryCreate, InventoryItemCreate, InventoryItemSchema, InventorySchema, InventoryUpdate, LowStockThresholdUpdate, ProductPage, ReplenishmentOrderCreate, ReplenishmentOrderSchema, StockBulkUpdateResponse, StockBulkUpdateSchema, StockUpdateSchema, WarehouseCreate, WarehouseSchema, WarehouseUpdate
 from domains.inventory.schemas import InventoryCreate, InventoryItemCreate, InventoryItemSchema, InventorySchema, InventoryUpdate, WarehouseCreate, WarehouseSchema, WarehouseUpdate, StockUpdateSchema
-from db import get_db
+from db import SessionLocal, get_async_db, get_db
+from producer import publish_events
+
+# Rows fetched per round trip from the server-side cursor when streaming the catalog
+CATALOG_STREAM_BATCH_SIZE = int(os.getenv("CATALOG_STREAM_BATCH_SIZE", "1000"))
+STOCK_BULK_MAX_ITEMS = int(os.getenv("STOCK_BULK_MAX_ITEMS", "10000"))
 
 # Create three separate routers
 inventory_router = APIRouter()  # For inventory endpoints
@@ -13,7 +23,7 @@ warehouse_router = APIRouter()  # For warehouse endpoints
 
 # Warehouse Endpoints
 @warehouse_router.post("/", response_model=WarehouseSchema, status_code=201)
-def create_warehouse(warehouse_data: WarehouseCreate, db: Session = Depends(get_db)):
+def create_warehouse(warehouse_data: WarehouseCreate, db: Session = Depends(get_db, scope="function")):
     try:
         warehouse_service = WarehouseService(db)
         return warehouse_service.create_warehouse(warehouse_data)
@@ -21,22 +31,22 @@ def create_warehouse(warehouse_data: WarehouseCreate, db: Session = Depends(get_
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @warehouse_router.get("/{warehouse_id}", response_model=WarehouseSchema)
-def get_warehouse(warehouse_id: int, db: Session = Depends(get_db)):
+def get_warehouse(warehouse_id: int, db: Session = Depends(get_db, scope="function")):
     warehouse_service = WarehouseService(db)
     return warehouse_service.get_warehouse(warehouse_id)
 
 @warehouse_router.put("/{warehouse_id}", response_model=WarehouseSchema)
-def update_warehouse(warehouse_id: int, warehouse_data: WarehouseUpdate, db: Session = Depends(get_db)):
+def update_warehouse(warehouse_id: int, warehouse_data: WarehouseUpdate, db: Session = Depends(get_db, scope="function")):
     warehouse_service = WarehouseService(db)
     return warehouse_service.update_warehouse(warehouse_id, warehouse_data)
 
 @warehouse_router.delete("/{warehouse_id}", status_code=204)
-def delete_warehouse(warehouse_id: int, db: Session = Depends(get_db)):
+def delete_warehouse(warehouse_id: int, db: Session = Depends(get_db, scope="function")):
     warehouse_service = WarehouseService(db)
     return warehouse_service.delete_warehouse(warehouse_id)
 
 @warehouse_router.get("/test_db", status_code=200)
-def test_db(db: Session = Depends(get_db)):
+def test_db(db: Session = Depends(get_db, scope="function")):
     try:
         # Simple query to test database connection
         result = db.execute("SELECT 1").scalar()
@@ -46,26 +56,26 @@ def test_db(db: Session = Depends(get_db)):
 
 # Inventory endpoints
 @inventory_router.post("/", status_code=201, response_model=InventorySchema)
-def create_inventory(inventory_data: InventoryCreate, db: Session = Depends(get_db)):
+def create_inventory(inventory_data: InventoryCreate, db: Session = Depends(get_db, scope="function")):
     inventory_service = InventoryService(db)
     return inventory_service.create_inventory(inventory_data)
 
 @inventory_router.get("/{inventory_id}", response_model=InventorySchema)
-def get_inventory(inventory_id: int, db: Session = Depends(get_db)):
-    inventory_service = InventoryService(db)
-    return inventory_service.get_inventory(inventory_id)
+async def get_inventory(inventory_id: int, db: AsyncSession = Depends(get_async_db, scope="function")):
+    inventory_service = AsyncInventoryService(db)
+    return await inventory_service.get_inventory(inventory_id)
 
 @inventory_router.put("/{inventory_id}", response_model=InventorySchema)
-def update_inventory(inventory_id: int, inventory_data: InventoryUpdate, db: Session = Depends(get_db)):
+def update_inventory(inventory_id: int, inventory_data: InventoryUpdate, db: Session = Depends(get_db, scope="function")):
     inventory_service = InventoryService(db)
     return inventory_service.update_inventory(inventory_id, inventory_data)
 
 @inventory_router.delete("/{inventory_id}", status_code=204)
-def delete_inventory(inventory_id: int, db: Session = Depends(get_db)):
+def delete_inventory(inventory_id: int, db: Session = Depends(get_db, scope="function")):
     inventory_service = InventoryService(db)
     return inventory_service.delete_inventory(inventory_id)
 @inventory_router.put("/{inventory_id}/items", response_model=InventoryItemSchema)
-def add_inventory_item(inventory_id: int, item_data: InventoryItemCreate, db: Session = Depends(get_db)):
+def add_inventory_item(inventory_id: int, item_data: InventoryItemCreate, db: Session = Depends(get_db, scope="function")):
     try:
         inventory_service = InventoryService(db)
         return inventory_service.add_inventory_item(inventory_id, item_data.dict())
@@ -76,10 +86,31 @@ def add_inventory_item(inventory_id: int, item_data: InventoryItemCreate, db: Se
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+@inventory_router.put("/items/{item_id}/threshold", response_model=InventoryItemSchema)
+def set_low_stock_threshold(item_id: int, threshold_data: LowStockThresholdUpdate, db: Session = Depends(get_db, scope="function")):
+    """Set the stock level below which the item raises low stock alerts"""
+    inventory_service = InventoryService(db)
+    return inventory_service.set_low_stock_threshold(item_id, threshold_data.low_stock_threshold)
+
+# Bulk stock endpoint (e.g. WMS snapshots)
+@inventory_router.put("/items/stock", response_model=StockBulkUpdateResponse)
+def update_stock_levels(stock_data: StockBulkUpdateSchema, background_tasks: BackgroundTasks, db: Session = Depends(get_db, scope="function")):
+    """Set stock for many items in one transaction and publish one inventory_updated batch"""
+    if len(stock_data.items) > STOCK_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {STOCK_BULK_MAX_ITEMS} items per request")
+    inventory_service = InventoryService(db)
+    updated, unknown = inventory_service.update_stock_levels((item.item_id, item.quantity) for item in stock_data.items)
+    if updated:
+        background_tasks.add_task(
+            publish_events,
+            topic="inventory_events",
+            events=[("inventory_updated", row, str(row["id"])) for row in updated]
+        )
+    return StockBulkUpdateResponse(updated=len(updated), unknown_item_ids=unknown)
 @inventory_router.put("/{inventory_id}/items/{item_id}/stock", response_model=InventoryItemSchema)
 # Stock level endpoint
 @inventory_router.put("/items/{item_id}/stock", response_model=InventoryItemSchema)
-def update_stock_level(item_id: int, stock_data: StockUpdateSchema, db: Session = Depends(get_db)):
+def update_stock_level(item_id: int, stock_data: StockUpdateSchema, db: Session = Depends(get_db, scope="function")):
     try:
         inventory_service = InventoryService(db)
         return inventory_service.update_stock_level(item_id, stock_data.dict())
@@ -91,13 +122,37 @@ def update_stock_level(item_id: int, stock_data: StockUpdateSchema, db: Session
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 # Product-specific endpoints
-@products_router.get("/", response_model=list[InventorySchema])
-def get_all_products(db: Session = Depends(get_db)):
+@products_router.get("/", response_model=ProductPage)
+def get_all_products(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    warehouse_id: Optional[int] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    stream: bool = Query(False, description="Stream the whole catalog as NDJSON instead of one page"),
+    db: Session = Depends(get_db, scope="function")
+):
+    """List catalog items by id using keyset pagination, or stream them all as NDJSON"""
+    filters = {"warehouse_id": warehouse_id, "min_price": min_price, "max_price": max_price}
     inventory_service = InventoryService(db)
-    # Implement a method to get all products
-    return []  # Replace with actual implementation
+    if stream:
+        # Validate up front so bad filters fail before the 200 is sent
+        inventory_service.catalog_filters(**filters)
+        return StreamingResponse(_stream_catalog(filters), media_type="application/x-ndjson")
+    products, next_cursor = inventory_service.get_product_page(limit, after, **filters)
+    return {"products": products, "next_cursor": next_cursor}
+
+def _stream_catalog(filters):
+    # The request's session is closed before the body is sent, so the stream
+    # holds its own session (and server-side cursor) for as long as it runs
+    db = SessionLocal()
+    try:
+        for partition in InventoryService(db).stream_products(CATALOG_STREAM_BATCH_SIZE, **filters):
+            yield "".join(json.dumps(dict(row)) + "\n" for row in partition)
+    finally:
+        db.close()
 @inventory_router.post("/{inventory_id}/orders", response_model=ReplenishmentOrderSchema)
-def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db)):
+def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db, scope="function")):
     try:
         inventory_service = InventoryService(db)
         return inventory_service.create_replenishment_order(inventory_id, order_data)
@@ -106,7 +161,7 @@ def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrder
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 @inventory_router.post("/{inventory_id}/orders", response_model=ReplenishmentOrderSchema)
-def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db)):
+def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db, scope="function")):
     try:
         inventory_service = InventoryService(db)
         return inventory_service.create_replenishment_order(inventory_id, order_data)
@@ -115,7 +170,7 @@ def create_replenishment_order(inventory_id: int, order_data: ReplenishmentOrder
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 @inventory_router.put("/{inventory_id}/orders/{order_id}", response_model=ReplenishmentOrderSchema)
-def update_replenishment_order(inventory_id: int, order_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db)):
+def update_replenishment_order(inventory_id: int, order_id: int, order_data: ReplenishmentOrderCreate, db: Session = Depends(get_db, scope="function")):
     try:
         inventory_service = InventoryService(db)
         return inventory_service.update_replenishment_order(inventory_id, order_id, order_data)
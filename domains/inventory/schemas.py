@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from enum import Enum
 
@@ -22,20 +22,49 @@ class InventoryItemCreate(BaseModel):
     product_id: int
     quantity: int
     price: Optional[float] = None
+    low_stock_threshold: Optional[int] = Field(None, ge=0)
 
 class InventoryItemSchema(BaseModel):
     id: int
     product_id: int
     quantity: int
     price: Optional[float] = None
+    low_stock_threshold: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+# Product Catalog Schemas
+class ProductSchema(BaseModel):
+    id: int  # inventory item id, also the pagination cursor
+    product_id: int
+    inventory_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
+    quantity: int
+    price: Optional[float] = None
+
+class ProductPage(BaseModel):
+    products: List[ProductSchema]
+    next_cursor: Optional[int] = None  # Pass as ?after= to fetch the next page
+
 # Stock Level Schemas
 class StockUpdateSchema(BaseModel):
     quantity: int
 
+class LowStockThresholdUpdate(BaseModel):
+    low_stock_threshold: Optional[int] = Field(None, ge=0)  # None reverts to the default
+
+class StockBulkUpdateItem(BaseModel):
+    item_id: int
+    quantity: int = Field(..., ge=0)
+
+class StockBulkUpdateSchema(BaseModel):
+    items: List[StockBulkUpdateItem]  # For repeated item ids the last entry wins
+
+class StockBulkUpdateResponse(BaseModel):
+    updated: int
+    unknown_item_ids: List[int] = []
+
 class StockLevelSchema(BaseModel):
     id: int
     item_id: int
@@ -53,6 +82,7 @@ class ReplenishmentOrderCreate(BaseModel):
 class ReplenishmentOrderSchema(BaseModel):
     id: int
     inventory_id: int
+    item_id: Optional[int] = None
     quantity: int
     status: OrderStatusEnum
     
@@ -1,8 +1,11 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
-from domains.inventory.repository import InventoryRepository
+from domains.inventory.repository import AsyncInventoryRepository, InventoryRepository
 from domains.inventory.models import Inventory, InventoryItem, StockLevel, Warehouse, ReplenishmentOrder
 from domains.inventory.schemas import InventoryCreate, InventoryUpdate, WarehouseCreate, WarehouseUpdate, ReplenishmentOrderCreate
+from domains.inventory.stock_ledger import STOCK_COMMANDS_TOPIC, get_stock_ledger, is_hot_item
+from outbox import enqueue_events
 
 class InventoryService:
     def __init__(self, db: Session):
@@ -40,24 +43,28 @@ class InventoryService:
             inventory_id=inventory_id,
             product_id=item_data["product_id"],
             quantity=item_data["quantity"],
-            price=item_data.get("price")
+            price=item_data.get("price"),
+            low_stock_threshold=item_data.get("low_stock_threshold")
         )
         
-        self.db.add(new_item)
-        self.db.commit()
-        self.db.refresh(new_item)
-        
         stock_level = StockLevel(
-            item_id=new_item.id,
+            item=new_item,
             quantity=new_item.quantity
         )
         
-        self.db.add(stock_level)
-        self.db.commit()
+        # One flush inserts the item, then its stock level with the new item id
+        self.db.add_all([new_item, stock_level])
+        self.db.flush()
         
         return new_item
     
     def update_stock_level(self, item_id: int, stock_data: dict):
+        if is_hot_item(item_id):
+            item = self._set_hot_stock_levels({item_id: stock_data["quantity"]}).get(item_id)
+            if not item:
+                raise HTTPException(status_code=404, detail="Inventory item not found")
+            return item
+        
         item = self.db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
         if not item:
             raise HTTPException(status_code=404, detail="Inventory item not found")
@@ -71,10 +78,88 @@ class InventoryService:
         
         item.quantity = stock_data["quantity"]
         
-        self.db.commit()
-        self.db.refresh(item)
+        self.db.flush()
+        return item
+    
+    def _set_hot_stock_levels(self, quantities):
+        """
+        Hot SKUs are applied in memory and written behind by the stock ledger.
+        Outside the process that owns it, send set_stock commands (through the
+        outbox, keyed like reservations) instead of writing the rows.
+        Returns {item_id: InventoryItem} for the items that exist.
+        """
+        ledger = get_stock_ledger()
+        items = {}
+        if ledger:
+            for item_id, quantity in quantities.items():
+                try:
+                    ledger.set_quantity(item_id, quantity)
+                except ValueError:
+                    continue
+                items[item_id] = ledger.get_item(item_id)
+            return items
+        
+        for item in self.db.query(InventoryItem).filter(InventoryItem.id.in_(quantities)):
+            self.db.expunge(item)
+            item.quantity = quantities[item.id]
+            items[item.id] = item
+        enqueue_events(self.db, STOCK_COMMANDS_TOPIC, [
+            ("set_stock", {"item_id": item_id, "quantity": quantities[item_id]}, str(item_id))
+            for item_id in sorted(items)
+        ])
+        return items
+    
+    def set_low_stock_threshold(self, item_id: int, threshold):
+        item = self.db.get(InventoryItem, item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Inventory item not found")
+        item.low_stock_threshold = threshold
+        self.db.flush()
         return item
     
+    def update_stock_levels(self, items):
+        """
+        Apply a stock snapshot of (item_id, quantity) pairs in one transaction.
+        Returns (updated rows as dicts, unknown item ids).
+        """
+        quantities = dict(items)
+        requested = set(quantities)
+        updated = []
+        
+        hot = {item_id: quantities.pop(item_id) for item_id in list(quantities) if is_hot_item(item_id)}
+        if hot:
+            updated.extend(
+                {"id": item.id, "product_id": item.product_id, "quantity": item.quantity}
+                for item in self._set_hot_stock_levels(hot).values()
+            )
+        
+        if quantities:
+            updated.extend(
+                {"id": item_id, "product_id": product_id, "quantity": quantity}
+                for item_id, product_id, quantity in self.repository.set_stock_levels(quantities)
+            )
+        
+        found = {row["id"] for row in updated}
+        unknown = sorted(requested - found)
+        return updated, unknown
+    
+    @staticmethod
+    def catalog_filters(warehouse_id: int = None, min_price: float = None, max_price: float = None):
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise HTTPException(status_code=422, detail="min_price cannot be greater than max_price")
+        return {"warehouse_id": warehouse_id, "min_price": min_price, "max_price": max_price}
+    
+    def get_product_page(self, limit: int, after_id: int = None, **filters):
+        """
+        Returns (products, next_cursor); next_cursor is None on the last page
+        """
+        rows = self.repository.get_catalog_page(limit, after_id, **self.catalog_filters(**filters))
+        next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+    
+    def stream_products(self, batch_size: int, **filters):
+        return self.repository.stream_catalog(batch_size, **self.catalog_filters(**filters))
+    
     def create_replenishment_order(self, inventory_id: int, order_data: ReplenishmentOrderCreate):
         # Check if inventory exists
         inventory = self.repository.get_inventory(inventory_id)
@@ -84,14 +169,14 @@ class InventoryService:
         # Create a new replenishment order
         new_order = ReplenishmentOrder(
             inventory_id=inventory_id,
+            item_id=order_data.item_id,
             quantity=order_data.quantity,
             status=order_data.status
         )
         
         # Add to database
         self.db.add(new_order)
-        self.db.commit()
-        self.db.refresh(new_order)
+        self.db.flush()
         
         return new_order
     
@@ -122,11 +207,37 @@ class InventoryService:
             order.item_id = order_data.item_id
         
         # Save changes
-        self.db.commit()
-        self.db.refresh(order)
+        self.db.flush()
         
         return order
 
+class AsyncInventoryService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repository = AsyncInventoryRepository(db)
+
+    async def create_inventory(self, inventory_data: InventoryCreate):
+        inventory = Inventory(warehouse_id=inventory_data.warehouse_id)
+        return await self.repository.create_inventory(inventory)
+
+    async def get_inventory(self, inventory_id: int):
+        inventory = await self.repository.get_inventory(inventory_id)
+        if not inventory:
+            raise HTTPException(status_code=404, detail="Inventory not found")
+        return inventory
+
+    async def update_inventory(self, inventory_id: int, inventory_data: InventoryUpdate):
+        inventory = await self.repository.update_inventory(inventory_id, inventory_data.dict(exclude_unset=True))
+        if not inventory:
+            raise HTTPException(status_code=404, detail="Inventory not found")
+        return inventory
+
+    async def delete_inventory(self, inventory_id: int):
+        inventory = await self.repository.delete_inventory(inventory_id)
+        if not inventory:
+            raise HTTPException(status_code=404, detail="Inventory not found")
+        return None
+
 class WarehouseService:
     def __init__(self, db: Session):
         self.db = db
@@ -134,8 +245,7 @@ class WarehouseService:
     def create_warehouse(self, warehouse_data: WarehouseCreate):
         warehouse = Warehouse(name=warehouse_data.name, location=warehouse_data.location)
         self.db.add(warehouse)
-        self.db.commit()
-        self.db.refresh(warehouse)
+        self.db.flush()
         return warehouse
     
     def get_warehouse(self, warehouse_id: int):
@@ -153,8 +263,7 @@ class WarehouseService:
         for key, value in update_data.items():
             setattr(warehouse, key, value)
         
-        self.db.commit()
-        self.db.refresh(warehouse)
+        self.db.flush()
         return warehouse
     
     def delete_warehouse(self, warehouse_id: int):
@@ -163,5 +272,5 @@ class WarehouseService:
             raise HTTPException(status_code=404, detail="Warehouse not found")
         
         self.db.delete(warehouse)
-        self.db.commit()
+        self.db.flush()
         return None
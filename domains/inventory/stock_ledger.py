@@ -0,0 +1,403 @@
+"""
+In-process stock ledger for designated hot SKUs.
+
+Stock changes for hot items are applied in memory (serialized per item),
+appended to a local log, and written behind to inventory_items and
+stock_levels as one coalesced delta per item every flush interval.
+
+Crash safety: every delta gets a sequence number in the append log before it
+is applied. A flush writes the deltas and the highest flushed sequence
+(stock_ledger_checkpoints) in one transaction, so on restart only log entries
+past the checkpoint are replayed.
+
+The in-memory quantity is authoritative, so exactly one process may own a
+hot item: the ledger is started only by the command consumer, and it holds a
+Postgres advisory lock per hot item for its lifetime. A second owner fails at
+startup. Other processes send stock changes for hot items as commands
+(STOCK_COMMANDS_TOPIC) rather than writing the rows.
+"""
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+from sqlalchemy import Integer, column, select, text, update, values
+from sqlalchemy.dialects.postgresql import insert
+
+from domains.inventory.models import InventoryItem, StockLedgerCheckpoint, StockLevel
+from metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+HOT_SKU_ITEM_IDS = [int(i) for i in os.getenv("HOT_SKU_ITEM_IDS", "").split(",") if i.strip()]
+HOT_SKU_FLUSH_INTERVAL = float(os.getenv("HOT_SKU_FLUSH_INTERVAL", "0.5"))
+HOT_SKU_LOG_DIR = os.getenv("HOT_SKU_LOG_DIR", "stock_ledger")
+HOT_SKU_LEDGER_ID = os.getenv("HOT_SKU_LEDGER_ID", socket.gethostname())
+# fsync every append (survives OS crashes, not just process crashes) at a latency cost
+HOT_SKU_LOG_FSYNC = os.getenv("HOT_SKU_LOG_FSYNC", "false").lower() in ("1", "true", "yes")
+
+inventory_items = InventoryItem.__table__
+stock_levels = StockLevel.__table__
+checkpoints = StockLedgerCheckpoint.__table__
+
+STOCK_COMMANDS_TOPIC = "inventory_commands"
+# First key of the two-key advisory locks (class, item id) that mark ledger ownership
+OWNER_LOCK_CLASS = 0x534B55
+
+
+class StockLedgerOwned(RuntimeError):
+    """
+    Another process already owns one of the hot items
+    """
+
+
+def is_hot_item(item_id):
+    return item_id in HOT_SKU_ITEM_IDS
+
+
+class _HotItem:
+    def __init__(self, item_id):
+        self.item_id = item_id
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.quantity = 0
+        self.pending = 0       # applied in memory, not yet flushed
+        self.attributes = {}   # other item columns, for responses
+
+
+class HotStockLedger:
+    def __init__(self, session_factory, item_ids, log_dir=HOT_SKU_LOG_DIR, ledger_id=HOT_SKU_LEDGER_ID,
+                 flush_interval=HOT_SKU_FLUSH_INTERVAL, fsync=HOT_SKU_LOG_FSYNC):
+        self.Session = session_factory
+        self.ledger_id = ledger_id
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.log_dir = log_dir
+        self.items = {item_id: _HotItem(item_id) for item_id in sorted(set(item_ids))}
+
+        self._log_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seq = 0
+        self._segment = None
+        self._segment_path = None
+        self._segment_first_seq = None  # first seq the open segment will hold
+        self._stop = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.flushed_deltas = 0
+
+        self._retired = {}  # item_id -> replayed delta for items no longer hot
+        self._owner_session = None
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._claim()
+        self._replay()
+        self._open_segment()
+
+    def is_hot(self, item_id):
+        return item_id in self.items
+
+    # --- append log -------------------------------------------------------
+
+    def _segments(self):
+        return sorted(glob.glob(os.path.join(self.log_dir, f"{self.ledger_id}-*.log")))
+
+    def _open_segment(self):
+        # Caller holds _log_lock (or is __init__)
+        if self._segment:
+            self._segment.close()
+        self._segment_first_seq = self._seq + 1
+        self._segment_path = os.path.join(self.log_dir, f"{self.ledger_id}-{self._segment_first_seq:020d}.log")
+        self._segment = open(self._segment_path, "a", encoding="utf-8")
+
+    def _append(self, item_id, delta):
+        with self._log_lock:
+            self._seq += 1
+            self._segment.write(json.dumps({"seq": self._seq, "item_id": item_id, "delta": delta}) + "\n")
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            return self._seq
+
+    # --- ownership ----------------------------------------------------------
+
+    def _claim(self):
+        """
+        Take the advisory lock for every hot item on a connection held until
+        stop(); raise StockLedgerOwned if any is held elsewhere
+        """
+        session = self.Session()
+        try:
+            # Autocommit: session-level locks without an idle transaction
+            session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            taken = []
+            for item_id in self.items:
+                if not session.execute(
+                    text("SELECT pg_try_advisory_lock(:owner, :item_id)"),
+                    {"owner": OWNER_LOCK_CLASS, "item_id": item_id}
+                ).scalar():
+                    for locked_id in taken:
+                        session.execute(
+                            text("SELECT pg_advisory_unlock(:owner, :item_id)"),
+                            {"owner": OWNER_LOCK_CLASS, "item_id": locked_id}
+                        )
+                    raise StockLedgerOwned(f"Hot item {item_id} is already owned by another stock ledger")
+                taken.append(item_id)
+        except Exception:
+            session.close()
+            raise
+        self._owner_session = session
+
+    def _release(self):
+        if self._owner_session is not None:
+            # Closing returns the connection to the pool, so unlock explicitly
+            self._owner_session.execute(text("SELECT pg_advisory_unlock_all()"))
+            self._owner_session.close()
+            self._owner_session = None
+
+    # --- replay ---------------------------------------------------------------
+
+    def _replay(self):
+        """
+        Re-apply logged deltas the database hasn't seen yet as pending deltas.
+        Deltas for items no longer in the hot set are only written back.
+        """
+        with self.Session() as session:
+            last_seq = session.execute(
+                select(checkpoints.c.last_seq).where(checkpoints.c.ledger_id == self.ledger_id)
+            ).scalar() or 0
+        self._seq = last_seq
+
+        replayed = 0
+        for path in self._segments():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write from the crash; nothing after it was applied
+                        break
+                    self._seq = max(self._seq, entry["seq"])
+                    if entry["seq"] <= last_seq:
+                        continue
+                    item = self.items.get(entry["item_id"])
+                    if item is None:
+                        self._retired[entry["item_id"]] = self._retired.get(entry["item_id"], 0) + entry["delta"]
+                    else:
+                        item.pending += entry["delta"]
+                    replayed += 1
+        if replayed:
+            logger.warning(f"Stock ledger replayed {replayed} unflushed deltas after checkpoint {last_seq}")
+
+    # --- in-memory state ----------------------------------------------------
+
+    def _ensure_loaded(self, item):
+        # Called before taking item.lock. The flush lock keeps a flush from
+        # zeroing pending between reading the row and adding pending to it
+        if item.loaded:
+            return
+        with self._flush_lock, item.lock:
+            if not item.loaded:
+                self._load(item)
+
+    def _load(self, item):
+        # Caller holds _flush_lock and item.lock
+        with self.Session() as session:
+            row = session.execute(
+                select(inventory_items).where(inventory_items.c.id == item.item_id)
+            ).mappings().first()
+        if row is None:
+            raise ValueError(f"Inventory item {item.item_id} not found")
+        # The database doesn't include pending (replayed) deltas yet
+        item.quantity = row["quantity"] + item.pending
+        item.attributes = {
+            "product_id": row["product_id"],
+            "price": row["price"],
+            "inventory_id": row["inventory_id"],
+            "low_stock_threshold": row["low_stock_threshold"],
+        }
+        item.loaded = True
+
+    def apply_delta(self, item_id, delta, allow_negative=False):
+        """
+        Apply a stock change. Returns the new quantity, or None if it would
+        take stock below zero and allow_negative is False.
+        """
+        item = self.items[item_id]
+        self._ensure_loaded(item)
+        with item.lock:
+            if not allow_negative and item.quantity + delta < 0:
+                return None
+            self._append(item_id, delta)
+            item.quantity += delta
+            item.pending += delta
+            return item.quantity
+
+    def try_reserve(self, item_id, quantity):
+        return self.apply_delta(item_id, -quantity)
+
+    def set_quantity(self, item_id, quantity):
+        """
+        Absolute stock update (e.g. a stock count), logged as a delta
+        """
+        item = self.items[item_id]
+        self._ensure_loaded(item)
+        with item.lock:
+            delta = quantity - item.quantity
+            if delta:
+                self._append(item_id, delta)
+                item.quantity += delta
+                item.pending += delta
+            return item.quantity
+
+    def get_item(self, item_id):
+        """
+        Current state of a hot item as a detached InventoryItem
+        """
+        item = self.items[item_id]
+        self._ensure_loaded(item)
+        with item.lock:
+            return InventoryItem(id=item_id, quantity=item.quantity, **item.attributes)
+
+    # --- write-behind -------------------------------------------------------
+
+    def flush(self):
+        """
+        Write all pending deltas as one UPDATE per table and advance the checkpoint
+        """
+        with self._flush_lock:
+            # Freeze every hot item (in id order) so the log prefix up to
+            # flushed_seq is exactly the set of deltas being flushed
+            held = [item.lock for item in self.items.values()]
+            for lock in held:
+                lock.acquire()
+            try:
+                deltas = [(item.item_id, item.pending) for item in self.items.values() if item.pending]
+                for item in self.items.values():
+                    item.pending = 0
+                retired, self._retired = self._retired, {}
+                deltas.extend((item_id, delta) for item_id, delta in retired.items() if delta)
+                with self._log_lock:
+                    flushed_seq = self._seq
+                    # Rotate only if the open segment has entries: reopening
+                    # an empty one would reuse its path (named by seq)
+                    if self._seq >= self._segment_first_seq:
+                        self._open_segment()
+                    # Never the open segment, which may be about to take appends
+                    old_segments = [path for path in self._segments() if path != self._segment_path]
+            finally:
+                for lock in reversed(held):
+                    lock.release()
+
+            if not deltas:
+                self._remove_segments(old_segments)
+                return 0
+
+            try:
+                with self.Session.begin() as session:
+                    changes = values(column("item_id", Integer), column("delta", Integer), name="changes").data(deltas)
+                    session.execute(
+                        update(inventory_items)
+                        .where(inventory_items.c.id == changes.c.item_id)
+                        .values(quantity=inventory_items.c.quantity + changes.c.delta)
+                    )
+                    session.execute(
+                        update(stock_levels)
+                        .where(stock_levels.c.item_id == changes.c.item_id)
+                        .values(quantity=stock_levels.c.quantity + changes.c.delta)
+                    )
+                    upsert = insert(checkpoints).values(ledger_id=self.ledger_id, last_seq=flushed_seq)
+                    session.execute(upsert.on_conflict_do_update(
+                        index_elements=[checkpoints.c.ledger_id],
+                        set_={"last_seq": upsert.excluded.last_seq}
+                    ))
+            except Exception as e:
+                # Put the deltas back; their log entries stay until a flush succeeds
+                logger.error(f"Stock ledger flush failed, will retry: {e}")
+                for item_id, delta in deltas:
+                    item = self.items.get(item_id)
+                    if item is None:
+                        self._retired[item_id] = self._retired.get(item_id, 0) + delta
+                        continue
+                    with item.lock:
+                        item.pending += delta
+                return 0
+
+            self._remove_segments(old_segments)
+            self.flushes += 1
+            self.flushed_deltas += len(deltas)
+            return len(deltas)
+
+    def _remove_segments(self, paths):
+        # Only segments closed before a successful flush (or with nothing pending)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stock-ledger-flush", daemon=True)
+            self._thread.start()
+            logger.info(f"Stock ledger started for hot items {sorted(self.items)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.flush()
+        with self._log_lock:
+            self._segment.close()
+        self._release()
+
+    def stats(self):
+        return {
+            "ledger_id": self.ledger_id,
+            "hot_items": {
+                item.item_id: {"quantity": item.quantity if item.loaded else None, "pending": item.pending}
+                for item in self.items.values()
+            },
+            "last_seq": self._seq,
+            "flushes": self.flushes,
+            "flushed_deltas": self.flushed_deltas,
+        }
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def start_stock_ledger(session_factory):
+    """
+    Own HOT_SKU_ITEM_IDS from this process (the command consumer). Returns
+    None when no items are designated; raises StockLedgerOwned if another
+    process owns any of them.
+    """
+    global _ledger
+    if not HOT_SKU_ITEM_IDS:
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            ledger = HotStockLedger(session_factory, HOT_SKU_ITEM_IDS)
+            ledger.start()
+            register_collector("stock_ledger", ledger.stats)
+            _ledger = ledger
+    return _ledger
+
+def get_stock_ledger():
+    """
+    This process's ledger, or None unless start_stock_ledger() ran here
+    """
+    return _ledger
+
+def stop_stock_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is not None:
+            _ledger.stop()
+            _ledger = None
@@ -1,5 +1,5 @@
 # order/models.py
-from sqlalchemy import Column, Float, Integer, String, ForeignKey, Enum
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from db import Base
 import enum
@@ -39,6 +39,11 @@ class Order(Base):
     tracking = relationship("OrderTracking", back_populates="order", uselist=False)  # One-to-One
     customer = relationship("Customer", back_populates="orders")  # Add this
     customer_preferences = relationship("CustomerPreference", back_populates="order")
+
+    # Keyset pagination of a customer's order history walks (customer_id, id)
+    __table_args__ = (
+        Index("ix_orders_customer_id_id", "customer_id", "id"),
+    )
     
 
 class OrderItem(Base):
@@ -1,23 +1,68 @@
 # domains/order/repository.py
-from sqlalchemy.orm import Session
-from domains.order.models import Order
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from domains.order.models import Order, OrderItem
+
+# How each relationship is fetched when a read path asks for it. Collections use
+# one extra SELECT ... IN per query; to-one relations are joined into the main query.
+ORDER_LOAD_STRATEGIES = {
+    "items": lambda: selectinload(Order.items),
+    "tracking": lambda: joinedload(Order.tracking),
+    "customer": lambda: joinedload(Order.customer),
+    "customer_preferences": lambda: selectinload(Order.customer_preferences),
+}
+
+def order_load_options(load=()):
+    unknown = set(load) - set(ORDER_LOAD_STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown order relationships: {sorted(unknown)}")
+    return [ORDER_LOAD_STRATEGIES[relation]() for relation in load]
 
 class OrderRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def create_order(self, order: Order):
-        try:
-            self.db.add(order)
-            self.db.commit()
-            self.db.refresh(order)
-            return order
-        except Exception as e:
-            self.db.rollback()
-            raise e
-
-    def get_order(self, order_id: int):
-        return self.db.query(Order).filter(Order.id == order_id).first()
+        self.db.add(order)
+        self.db.flush()
+        return order
+
+    def create_orders_bulk(self, orders: list, items_per_order: list):
+        """
+        Insert many orders and their items with multi-row INSERTs.
+        Returns the new order ids in input order.
+        """
+        order_ids = self.db.execute(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            orders
+        ).scalars().all()
+
+        item_rows = [
+            dict(item, order_id=order_id)
+            for order_id, items in zip(order_ids, items_per_order)
+            for item in items
+        ]
+        if item_rows:
+            self.db.execute(insert(OrderItem), item_rows)
+        return order_ids
+
+    def get_order(self, order_id: int, load=()):
+        """
+        Fetch one order with the relationships named in load
+        (keys of ORDER_LOAD_STRATEGIES) loaded up front
+        """
+        return self.db.execute(
+            select(Order).options(*order_load_options(load)).where(Order.id == order_id)
+        ).unique().scalars().first()
+
+    def get_orders(self, order_ids: list, load=()):
+        """
+        Fetch many orders for list views; query count doesn't grow with len(order_ids)
+        """
+        return self.db.execute(
+            select(Order).options(*order_load_options(load)).where(Order.id.in_(order_ids)).order_by(Order.id)
+        ).unique().scalars().all()
 
     def update_order(self, order_id: int, update_data: dict):
         order = self.get_order(order_id)
@@ -27,8 +72,7 @@ class OrderRepository:
         for key, value in update_data.items():
             setattr(order, key, value)
         
-        self.db.commit()
-        self.db.refresh(order)
+        self.db.flush()
         return order
 
     def delete_order(self, order_id: int):
@@ -37,5 +81,83 @@ class OrderRepository:
             return False
         
         self.db.delete(order)
-        self.db.commit()
-        return True
\ No newline at end of file
+        self.db.flush()
+        return True
+
+
+class AsyncOrderRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_order(self, order: Order):
+        self.db.add(order)
+        await self.db.flush()
+        return order
+
+    async def get_order(self, order_id: int, load=()):
+        # Relationships must be loaded up front, lazy loads can't run in async code
+        result = await self.db.execute(
+            select(Order).options(*order_load_options(load)).where(Order.id == order_id)
+        )
+        return result.unique().scalars().first()
+
+    async def get_orders(self, order_ids: list, load=()):
+        result = await self.db.execute(
+            select(Order).options(*order_load_options(load)).where(Order.id.in_(order_ids)).order_by(Order.id)
+        )
+        return result.unique().scalars().all()
+
+    async def get_order_totals(self, order_ids: list):
+        """
+        Item count, quantity and amount per order, aggregated in SQL in one query.
+        Orders without items are included with zero totals.
+        """
+        result = await self.db.execute(
+            select(
+                Order.id.label("order_id"),
+                Order.customer_id,
+                Order.status,
+                func.count(OrderItem.id).label("item_count"),
+                func.coalesce(func.sum(OrderItem.quantity), 0).label("total_quantity"),
+                func.coalesce(func.sum(OrderItem.quantity * OrderItem.unit_price), 0).label("total_amount"),
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.id.in_(order_ids))
+            .group_by(Order.id)
+            .order_by(Order.id)
+        )
+        return result.mappings().all()
+
+    async def get_customer_orders(self, customer_id: int, limit: int, before_id: int = None, statuses=None, load=("items",)):
+        """
+        One keyset page of a customer's orders, newest first. Fetches limit + 1
+        rows so the caller can tell whether an older page exists.
+        """
+        query = select(Order).options(*order_load_options(load)).where(Order.customer_id == customer_id)
+        if before_id is not None:
+            query = query.where(Order.id < before_id)
+        if statuses:
+            query = query.where(Order.status.in_(statuses))
+        result = await self.db.execute(query.order_by(Order.id.desc()).limit(limit + 1))
+        return result.unique().scalars().all()
+
+    async def update_order(self, order_id: int, update_data: dict):
+        order = await self.get_order(order_id)
+        if not order:
+            return None
+
+        for key, value in update_data.items():
+            setattr(order, key, value)
+
+        await self.db.flush()
+        return order
+
+    async def delete_order(self, order_id: int):
+        # Deleting detaches the children, which needs them loaded in async code
+        order = await self.get_order(order_id, load=("items", "tracking", "customer_preferences"))
+        if not order:
+            return False
+
+        await self.db.delete(order)
+        await self.db.flush()
+        return True
@@ -1,97 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from db import get_db
-from domains.order.service import OrderService
-from domains.order.schemas import OrderCreateSchema, OrderSchema, OrderUpdate
-from main import publish_event  # Import event publishing function
+from db import get_async_db, get_db
+from domains.order.service import AsyncOrderService, OrderService
+from domains.order.models import OrderStatusEnum
+from domains.order.schemas import OrderBatchCreateSchema, OrderBatchResponse, OrderCreateSchema, OrderPage, OrderSchema, OrderSummaryResponse, OrderUpdate
+import os
 
 router = APIRouter()
+customer_orders_router = APIRouter()  # Mounted under /customers
+
+# Largest batch accepted by POST /orders/batch
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", "1000"))
+# Most order ids accepted by GET /orders/summary
+ORDER_SUMMARY_MAX_IDS = int(os.getenv("ORDER_SUMMARY_MAX_IDS", "1000"))
+
+# Order events are written to the outbox in the request's transaction and
+# published by the outbox relay (worker.py), never from the request itself
 
 @router.post("/", response_model=OrderSchema, status_code=201)
-def create_order(order_data: OrderCreateSchema, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Create a new order and publish an event"""
+def create_order(order_data: OrderCreateSchema, db: Session = Depends(get_db, scope="function")):
+    """Create a new order and its order_created event"""
     try:
         order_service = OrderService(db)
-        db_order = order_service.create_order(order_data)
-        
-        # Publish event in the background
-        background_tasks.add_task(
-            publish_event,
-            topic="order_events",
-            event_type="order_created",
-            payload=db_order.dict(),
-            key=str(db_order.id)
-        )
-
-        return db_order
+        return order_service.create_order(order_data)
     except Exception as e:
         print(f"Error creating order: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/batch", response_model=OrderBatchResponse, status_code=201)
+def create_orders_batch(batch: OrderBatchCreateSchema, db: Session = Depends(get_db, scope="function")):
+    """Create many orders and their order_created events in one transaction"""
+    if not batch.orders:
+        raise HTTPException(status_code=422, detail="Batch contains no orders")
+    if len(batch.orders) > ORDER_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {ORDER_BATCH_MAX_SIZE} orders")
+
+    order_service = OrderService(db)
+    order_ids = order_service.create_orders_batch(batch)
+    return OrderBatchResponse(order_ids=order_ids)
+
+# Declared before /{order_id} so "summary" isn't parsed as an order id
+@router.get("/summary", response_model=OrderSummaryResponse)
+async def get_order_summary(ids: List[int] = Query(...), db: AsyncSession = Depends(get_async_db, scope="function")):
+    """Totals for many orders (?ids=1&ids=2...), computed by one aggregate query"""
+    if len(ids) > ORDER_SUMMARY_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {ORDER_SUMMARY_MAX_IDS} order ids per request")
+    order_service = AsyncOrderService(db)
+    return await order_service.get_order_summary(ids)
+
 @router.get("/{order_id}", response_model=OrderSchema)
-def get_order(order_id: int, db: Session = Depends(get_db)):
+async def get_order(order_id: int, db: AsyncSession = Depends(get_async_db, scope="function")):
     """Retrieve an order by ID"""
-    order_service = OrderService(db)
-    db_order = order_service.get_order(order_id)
+    order_service = AsyncOrderService(db)
+    # OrderSchema only has order columns, so skip relationship loading (1 query)
+    db_order = await order_service.get_order(order_id, load=())
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
     return db_order
 
 @router.put("/{order_id}", response_model=OrderSchema)
-def update_order(order_id: int, order_data: OrderUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Update an order and publish an event"""
+def update_order(order_id: int, order_data: OrderUpdate, db: Session = Depends(get_db, scope="function")):
+    """Update an order and record an order_updated event"""
     order_service = OrderService(db)
     db_order = order_service.update_order(order_id, order_data)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
-
-    # Publish event in the background
-    background_tasks.add_task(
-        publish_event,
-        topic="order_events",
-        event_type="order_updated",
-        payload=db_order.dict(),
-        key=str(db_order.id)
-    )
-
     return db_order
 
 @router.put("/{order_id}/status", response_model=OrderSchema)
-def update_order_status(order_id: int, status: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Update an order's status and publish an event"""
+def update_order_status(order_id: int, status: str, db: Session = Depends(get_db, scope="function")):
+    """Update an order's status and record an order_status_updated event"""
     order_service = OrderService(db)
     db_order = order_service.update_order_status(order_id, status)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
-
-    # Publish event in the background
-    background_tasks.add_task(
-        publish_event,
-        topic="order_events",
-        event_type="order_status_updated",
-        payload={"order_id": order_id, "status": status},
-        key=str(order_id)
-    )
-
     return db_order
 
-@router.delete("/{order_id}", response_model=dict, status_code=204)
-def delete_order(order_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Delete an order and publish an event"""
+@router.delete("/{order_id}", status_code=204)
+def delete_order(order_id: int, db: Session = Depends(get_db, scope="function")):
+    """Delete an order and record an order_deleted event"""
     order_service = OrderService(db)
     result = order_service.delete_order(order_id)
     if not result:
         raise HTTPException(status_code=404, detail="Order not found")
-
-    # Publish event in the background
-    background_tasks.add_task(
-        publish_event,
-        topic="order_events",
-        event_type="order_deleted",
-        payload={"order_id": order_id},
-        key=str(order_id)
-    )
-
     return {"message": "Order deleted successfully"}
+
+@customer_orders_router.get("/{customer_id}/orders", response_model=OrderPage)
+async def list_customer_orders(
+    customer_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[List[OrderStatusEnum]] = Query(None),
+    db: AsyncSession = Depends(get_async_db, scope="function")
+):
+    """List a customer's orders newest first, with their items, using keyset pagination"""
+    order_service = AsyncOrderService(db)
+    orders, next_cursor = await order_service.get_customer_order_page(customer_id, limit, before, status)
+    return {"orders": orders, "next_cursor": next_cursor}
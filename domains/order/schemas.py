@@ -42,6 +42,12 @@ class OrderCreateSchema(BaseModel):
     shipment_status: OrderShipmentStatusEnum = OrderShipmentStatusEnum.NOT_SHIPPED
     items: List[OrderItemSchema]
 
+class OrderBatchCreateSchema(BaseModel):
+    orders: List[OrderCreateSchema]
+
+class OrderBatchResponse(BaseModel):
+    order_ids: List[int]  # In the same order as the submitted orders
+
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatusEnum] = None  
 
@@ -65,6 +71,35 @@ class OrderSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderItemDetailSchema(BaseModel):
+    id: int
+    product_id: int
+    quantity: int
+    unit_price: float
+
+    class Config:
+        from_attributes = True
+
+class OrderWithItemsSchema(OrderSchema):
+    items: List[OrderItemDetailSchema] = []
+
+class OrderPage(BaseModel):
+    orders: List[OrderWithItemsSchema]
+    next_cursor: Optional[int] = None  # Pass as ?before= to fetch the next (older) page
+
+class OrderTotalSchema(BaseModel):
+    order_id: int
+    customer_id: Optional[int] = None
+    status: Optional[OrderStatusEnum] = None
+    item_count: int
+    total_quantity: int
+    total_amount: float
+
+class OrderSummaryResponse(BaseModel):
+    orders: List[OrderTotalSchema]
+    missing_ids: List[int] = []
+    grand_total: float
+
 # Inventory Schemas
 class InventoryBase(BaseModel):
     name: str
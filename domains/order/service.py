@@ -1,8 +1,47 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from domains.order.repository import OrderRepository
-from domains.order.schemas import OrderCreateSchema, OrderUpdate
-from domains.order.models import Order, OrderItem
+from domains.order.repository import AsyncOrderRepository, OrderRepository
+from fastapi import HTTPException
+from sqlalchemy import select
+from domains.customer.models import Customer
+from domains.order.schemas import OrderBatchCreateSchema, OrderCreateSchema, OrderUpdate
+from domains.order.models import Order, OrderItem, OrderStatusEnum
 from domains.order.aggregate import OrderAggregate
+from outbox import enqueue_event, enqueue_events
+
+ORDER_EVENTS_TOPIC = "order_events"
+
+# Relationships loaded for a full order read; endpoints that only serialize
+# order columns pass load=() and cost a single query
+ORDER_DETAIL_LOAD = ("items", "tracking")
+
+def _order_aggregate(order: Order, load) -> OrderAggregate:
+    # Only touch relationships that were loaded, anything else would lazy-load
+    return OrderAggregate(
+        order,
+        order.items if "items" in load else None,
+        order.status, order.payment_status, order.shipment_status,
+        order.tracking if "tracking" in load else None
+    )
+
+def order_created_payload(order_id: int, order_data: OrderCreateSchema) -> dict:
+    """Serializable order_created event payload"""
+    return {
+        "id": order_id,
+        "customer_id": order_data.customer_id,
+        "status": order_data.status.value,
+        "items": [item.model_dump() for item in order_data.items],
+    }
+
+def order_payload(order: Order) -> dict:
+    """Serializable snapshot of an order's columns for order_updated events"""
+    return {
+        "id": order.id,
+        "customer_id": order.customer_id,
+        "status": order.status.value if order.status else None,
+        "payment_status": order.payment_status.value if order.payment_status else None,
+        "shipment_status": order.shipment_status.value if order.shipment_status else None,
+    }
 
 class OrderService:
     def __init__(self, db: Session):
@@ -29,6 +68,10 @@ class OrderService:
 
         # Use the repository to save the order
         created_order = self.order_repo.create_order(order)
+        enqueue_event(
+            self.db, ORDER_EVENTS_TOPIC, "order_created",
+            order_created_payload(created_order.id, order_data), key=str(created_order.id)
+        )
 
         # Return the aggregate
         aggregate = OrderAggregate(
@@ -37,32 +80,159 @@ class OrderService:
         )
         return aggregate.order
 
-    def get_order(self, order_id: int):
-        order = self.order_repo.get_order(order_id)
+    def create_orders_batch(self, batch: OrderBatchCreateSchema):
+        """
+        Validate and insert a batch of orders, and their order_created
+        events, in a single transaction. Returns the new ids in input order.
+        """
+        customer_ids = {order.customer_id for order in batch.orders}
+        known_ids = set(self.db.execute(select(Customer.id).where(Customer.id.in_(customer_ids))).scalars())
+        unknown_ids = sorted(customer_ids - known_ids)
+        if unknown_ids:
+            raise HTTPException(status_code=422, detail=f"Unknown customer ids: {unknown_ids}")
+        empty = [index for index, order in enumerate(batch.orders) if not order.items]
+        if empty:
+            raise HTTPException(status_code=422, detail=f"Orders without items at positions: {empty}")
+
+        orders = [
+            {
+                "status": order.status,
+                "payment_status": order.payment_status,
+                "shipment_status": order.shipment_status,
+                "customer_id": order.customer_id,
+            }
+            for order in batch.orders
+        ]
+        items_per_order = [[item.model_dump() for item in order.items] for order in batch.orders]
+
+        order_ids = self.order_repo.create_orders_bulk(orders, items_per_order)
+
+        enqueue_events(self.db, ORDER_EVENTS_TOPIC, [
+            ("order_created", order_created_payload(order_id, order), str(order_id))
+            for order_id, order in zip(order_ids, batch.orders)
+        ])
+        return order_ids
+
+    def get_order(self, order_id: int, load=ORDER_DETAIL_LOAD):
+        order = self.order_repo.get_order(order_id, load)
         if not order:
             return None
         
-        # Handle the case where tracking might not exist
-        tracking = order.tracking if hasattr(order, 'tracking') else None
-        
         # Create the aggregate
+        return _order_aggregate(order, load).order
+
+    def get_orders(self, order_ids: list, load=ORDER_DETAIL_LOAD):
+        orders = self.order_repo.get_orders(order_ids, load)
+        return [_order_aggregate(order, load).order for order in orders]
+
+    def update_order(self, order_id: int, order_data: OrderUpdate):
+        update_data = {}
+        if order_data.status:
+            update_data["status"] = order_data.status
+        
+        updated_order = self.order_repo.update_order(order_id, update_data)
+        if updated_order:
+            enqueue_event(self.db, ORDER_EVENTS_TOPIC, "order_updated", order_payload(updated_order), key=str(order_id))
+        return updated_order
+
+    def update_order_status(self, order_id: int, status: str):
+        try:
+            status = OrderStatusEnum(status)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid order status: {status}")
+        updated_order = self.order_repo.update_order(order_id, {"status": status})
+        if updated_order:
+            enqueue_event(
+                self.db, ORDER_EVENTS_TOPIC, "order_status_updated",
+                {"order_id": order_id, "status": status.value}, key=str(order_id)
+            )
+        return updated_order
+
+    def delete_order(self, order_id: int):
+        deleted = self.order_repo.delete_order(order_id)
+        if deleted:
+            enqueue_event(self.db, ORDER_EVENTS_TOPIC, "order_deleted", {"order_id": order_id}, key=str(order_id))
+        return deleted
+
+
+class AsyncOrderService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.order_repo = AsyncOrderRepository(db)
+
+    async def create_order(self, order_data: OrderCreateSchema):
+        order = Order(
+            status=order_data.status,
+            payment_status=order_data.payment_status,
+            shipment_status=order_data.shipment_status,
+            customer_id=order_data.customer_id
+        )
+
+        for item in order_data.items:
+            order.items.append(OrderItem(
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_price=item.unit_price
+            ))
+
+        created_order = await self.order_repo.create_order(order)
+        await self._enqueue_event(
+            "order_created", order_created_payload(created_order.id, order_data), key=str(created_order.id)
+        )
+
         aggregate = OrderAggregate(
-            order, order.items, order.status, order.payment_status, 
-            order.shipment_status, tracking
+            created_order, created_order.items, created_order.status,
+            created_order.payment_status, created_order.shipment_status
         )
         return aggregate.order
 
-    def update_order(self, order_id: int, order_data: OrderUpdate):
-        order = self.order_repo.get_order(order_id)
+    async def _enqueue_event(self, event_type, payload, key):
+        # Same outbox insert as OrderService, on the sync session behind this one
+        await self.db.run_sync(enqueue_event, ORDER_EVENTS_TOPIC, event_type, payload, key)
+
+    async def get_order(self, order_id: int, load=ORDER_DETAIL_LOAD):
+        order = await self.order_repo.get_order(order_id, load)
         if not order:
             return None
-        
+
+        return _order_aggregate(order, load).order
+
+    async def get_orders(self, order_ids: list, load=ORDER_DETAIL_LOAD):
+        orders = await self.order_repo.get_orders(order_ids, load)
+        return [_order_aggregate(order, load).order for order in orders]
+
+    async def get_order_summary(self, order_ids: list):
+        order_ids = list(dict.fromkeys(order_ids))
+        totals = await self.order_repo.get_order_totals(order_ids)
+        found = {row["order_id"] for row in totals}
+        return {
+            "orders": totals,
+            "missing_ids": [order_id for order_id in order_ids if order_id not in found],
+            "grand_total": sum(row["total_amount"] for row in totals),
+        }
+
+    async def get_customer_order_page(self, customer_id: int, limit: int, before_id: int = None, statuses=None):
+        """
+        Returns (orders, next_cursor); next_cursor is None on the last page
+        """
+        orders = await self.order_repo.get_customer_orders(customer_id, limit, before_id, statuses)
+        if len(orders) > limit:
+            orders = orders[:limit]
+            return orders, orders[-1].id
+        return orders, None
+
+    async def update_order(self, order_id: int, order_data: OrderUpdate):
         update_data = {}
         if order_data.status:
             update_data["status"] = order_data.status
-        
-        updated_order = self.order_repo.update_order(order_id, update_data)
+
+        updated_order = await self.order_repo.update_order(order_id, update_data)
+        if updated_order:
+            await self._enqueue_event("order_updated", order_payload(updated_order), key=str(order_id))
         return updated_order
 
-    def delete_order(self, order_id: int):
-        return self.order_repo.delete_order(order_id)
+    async def delete_order(self, order_id: int):
+        deleted = await self.order_repo.delete_order(order_id)
+        if deleted:
+            await self._enqueue_event("order_deleted", {"order_id": order_id}, key=str(order_id))
+        return deleted
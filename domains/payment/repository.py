@@ -1,4 +1,6 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from domains.payment.models import PaymentModel, TransactionModel, InvoiceModel, RefundModel
 from domains.payment.schema import PaymentCreateSchema
 from domains.payment.aggregates import PaymentStatus
@@ -35,8 +37,7 @@ class PaymentRepository:
         )
         db.add(invoice)
         
-        db.commit()
-        db.refresh(db_payment)
+        db.flush()
         return db_payment
 
     @staticmethod
@@ -45,14 +46,34 @@ class PaymentRepository:
 
     @staticmethod
     def update_status(db: Session, payment_id: int, status: PaymentStatus):
-        try:
-            payment = db.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
-            if payment:
-                payment.status = status
-                db.commit()
-                db.refresh(payment)
-            return payment
-        except Exception as e:
-            db.rollback()
-            raise e
+        payment = db.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
+        if payment:
+            payment.status = status
+            db.flush()
+        return payment
 
+
+class AsyncPaymentRepository:
+    @staticmethod
+    async def get_payment(db: AsyncSession, payment_id: int):
+        # PaymentResponseSchema serializes every child relationship
+        result = await db.execute(
+            select(PaymentModel)
+            .options(
+                selectinload(PaymentModel.transactions),
+                selectinload(PaymentModel.invoice),
+                selectinload(PaymentModel.refund),
+            )
+            .where(PaymentModel.id == payment_id)
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def update_status(db: AsyncSession, payment_id: int, status: PaymentStatus):
+        payment = await AsyncPaymentRepository.get_payment(db, payment_id)
+        if payment:
+            payment.status = status
+            for transaction in payment.transactions:
+                transaction.status = status
+            await db.flush()
+        return payment
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_async_db, get_db
 from domains.payment.schema import PaymentCreateSchema, PaymentResponseSchema, PaymentStatusUpdate
-from domains.payment.service import PaymentService
+from domains.payment.service import AsyncPaymentService, PaymentService
 from domains.payment.aggregates import PaymentStatus
 
 # Remove the prefix here since it's already defined in main.py
 router = APIRouter()
 
 @router.post("/", response_model=PaymentResponseSchema, operation_id="create_payment_unique")
-def create_payment(payment: PaymentCreateSchema, db: Session = Depends(get_db)):
+def create_payment(payment: PaymentCreateSchema, db: Session = Depends(get_db, scope="function")):
     try:
         return PaymentService.process_payment(db, payment)
     except HTTPException as e:
@@ -19,19 +20,19 @@ def create_payment(payment: PaymentCreateSchema, db: Session = Depends(get_db)):
 
 
 @router.get("/{payment_id}", response_model=PaymentResponseSchema)
-def get_payment(payment_id: int, db: Session = Depends(get_db)):
-    payment = PaymentService.get_payment_details(db, payment_id)
+async def get_payment(payment_id: int, db: AsyncSession = Depends(get_async_db, scope="function")):
+    payment = await AsyncPaymentService.get_payment_details(db, payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
 
 @router.put("/{payment_id}")
-def update_payment_status(
+async def update_payment_status(
     payment_id: int,
     status: PaymentStatus = Body(..., embed=True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db, scope="function")
 ):
-    payment = PaymentService.update_payment_status(db, payment_id, status)
+    payment = await AsyncPaymentService.update_payment_status(db, payment_id, status)
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     return payment
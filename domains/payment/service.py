@@ -1,6 +1,7 @@
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from domains.payment.repository import PaymentRepository
+from domains.payment.repository import AsyncPaymentRepository, PaymentRepository
 from domains.payment.schema import PaymentCreateSchema
 from domains.payment.aggregates import PaymentStatus, PaymentMethod
 from domains.payment.models import PaymentModel, TransactionModel, InvoiceModel, RefundModel
@@ -46,17 +47,15 @@ class PaymentService:
                 db_payment.status = PaymentStatus.COMPLETED
                 transaction.status = PaymentStatus.COMPLETED
             
-            db.commit()
-            db.refresh(db_payment)
+            db.flush()
             return db_payment
         
         except SQLAlchemyError as e:
-            db.rollback()
+            # The request's unit of work rolls back on the raised HTTPException
             # Log the error for debugging
             print(f"Database error occurred: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         except Exception as e:
-            db.rollback()
             # Log the error for debugging
             print(f"Unexpected error occurred: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
@@ -67,18 +66,23 @@ class PaymentService:
 
     @staticmethod
     def update_payment_status(db: Session, payment_id: int, status: PaymentStatus):
-        try:
-            payment = db.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
-            if payment:
-                payment.status = status
-                
-                # Update associated transaction status
-                for transaction in payment.transactions:
-                    transaction.status = status
-                
-                db.commit()
-                db.refresh(payment)
-            return payment
-        except Exception as e:
-            db.rollback()
-            raise e
\ No newline at end of file
+        payment = db.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
+        if payment:
+            payment.status = status
+            
+            # Update associated transaction status
+            for transaction in payment.transactions:
+                transaction.status = status
+            
+            db.flush()
+        return payment
+
+
+class AsyncPaymentService:
+    @staticmethod
+    async def get_payment_details(db: AsyncSession, payment_id: int):
+        return await AsyncPaymentRepository.get_payment(db, payment_id)
+
+    @staticmethod
+    async def update_payment_status(db: AsyncSession, payment_id: int, status: PaymentStatus):
+        return await AsyncPaymentRepository.update_status(db, payment_id, status)
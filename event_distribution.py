@@ -1,37 +1,79 @@
 # event_distribution.py
+import functools
 import logging
 import threading
 import time
-from sqlalchemy import create_engine
+from collections import defaultdict
 from sqlalchemy.orm import sessionmaker
+from db import build_engine
+from metrics import register_collector
 from consumer import KafkaConsumer
 from producer import KafkaProducer
 from event_handlers import InventoryEventHandler, OrderEventHandler, WarehouseEventHandler
+from domains.inventory.availability import AvailabilityIndex
+from domains.inventory.low_stock import LowStockMonitor
+from domains.inventory.reservation import InventoryReservationEngine
+from domains.inventory.stock_ledger import start_stock_ledger
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Consumer groups run by the system; worker.py can run each in its own processes
+CONSUMER_GROUPS = ('cdc', 'command', 'event')
+
+# (Debezium op, source table) -> (topic, event type) of the derived domain event
+CDC_DOMAIN_EVENTS = {
+    ('c', 'inventory'): ('inventory_events', 'inventory_created'),
+    ('u', 'inventory'): ('inventory_events', 'inventory_updated'),
+}
+
 class EventDistributionSystem:
     """
     Main event distribution system that implements multiple patterns
     """
-    def __init__(self, db_url, kafka_servers):
-        self.db_engine = create_engine(db_url)
+    def __init__(self, db_url, kafka_servers, groups=CONSUMER_GROUPS):
+        unknown = set(groups) - set(CONSUMER_GROUPS)
+        if unknown:
+            raise ValueError(f"Unknown consumer groups: {sorted(unknown)}")
+
+        # Pool sized via EVENTS_DB_POOL_SIZE etc., falling back to DB_POOL_*
+        self.db_engine = build_engine(db_url, "events", env_prefix="EVENTS_DB")
         self.Session = sessionmaker(bind=self.db_engine)
         
         # Create producer
-        self.producer = KafkaProducer(bootstrap_servers=kafka_servers)
+        self.producer = KafkaProducer(bootstrap_servers=kafka_servers, name='events')
+        
+        # Applies reserve_inventory commands against inventory_items/stock_levels
+        # (hot SKUs go through this process's stock ledger when one is configured;
+        # only the process running the command group owns it, and a second
+        # owner fails here with StockLedgerOwned)
+        self.ledger = start_stock_ledger(self.Session) if 'command' in groups else None
+        self.reservation_engine = InventoryReservationEngine(self.Session, ledger=self.ledger)
         
-        # Create consumers for different event patterns
-        self.cdc_consumer = self._create_cdc_consumer(kafka_servers)
-        self.command_consumer = self._create_command_consumer(kafka_servers)
-        self.event_consumer = self._create_event_consumer(kafka_servers)
+        # Per-process view of stock per product and warehouse for fulfillment
+        self.availability_index = AvailabilityIndex(self.Session)
+        register_collector('availability_index', self.availability_index.stats)
+        
+        # Debounced, batched low_stock_alerts
+        self.low_stock_monitor = LowStockMonitor(self.Session, self.producer)
+        register_collector('low_stock', self.low_stock_monitor.stats)
         
         # Create event handlers
         db_session = self.Session()
-        self.inventory_handler = InventoryEventHandler(db_session)
+        self.inventory_handler = InventoryEventHandler(db_session, self.availability_index, self.low_stock_monitor)
         self.order_handler = OrderEventHandler(db_session, self.producer)
-        self.warehouse_handler = WarehouseEventHandler(db_session)
+        self.warehouse_handler = WarehouseEventHandler(db_session, self.availability_index, self.producer)
+        
+        # Create consumers for the requested event patterns only
+        factories = {
+            'cdc': self._create_cdc_consumer,
+            'command': self._create_command_consumer,
+            'event': self._create_event_consumer,
+        }
+        self.consumers = {group: factories[group](kafka_servers) for group in groups}
+        self.cdc_consumer = self.consumers.get('cdc')
+        self.command_consumer = self.consumers.get('command')
+        self.event_consumer = self.consumers.get('event')
     
     def _create_cdc_consumer(self, kafka_servers):
         """
@@ -52,10 +94,9 @@ class EventDistributionSystem:
             'ecommerce.public.payments'
         ])
         
-        # Register handlers for CDC events
-        consumer.register_handler('c', self._handle_create)
-        consumer.register_handler('u', self._handle_update)
-        consumer.register_handler('d', self._handle_delete)
+        # CDC rows are handled in batches (runs of the same op within a poll)
+        for op in ('c', 'u', 'd'):
+            consumer.register_batch_handler(op, functools.partial(self._handle_cdc_batch, op))
         
         return consumer
     
@@ -76,7 +117,9 @@ class EventDistributionSystem:
         ])
         
         # Register handlers for commands
-        consumer.register_handler('reserve_inventory', self._handle_reserve_inventory)
+        # One reservation transaction per run of consecutive commands in a poll
+        consumer.register_batch_handler('reserve_inventory', self._reserve_inventory_batch)
+        consumer.register_batch_handler('set_stock', self._set_stock_batch)
         consumer.register_handler('process_payment', self._handle_process_payment)
         
         return consumer
@@ -101,100 +144,81 @@ class EventDistributionSystem:
         consumer.register_handler('order_created', self.order_handler.handle_order_created)
         consumer.register_handler('payment_processed', self.order_handler.handle_payment_processed)
         consumer.register_handler('inventory_updated', self.inventory_handler.handle_inventory_updated)
-        consumer.register_handler('order_ready_for_fulfillment', self.warehouse_handler.handle_order_ready_for_fulfillment)
+        consumer.register_handler('inventory_reserved', self.inventory_handler.handle_inventory_reserved)
+        consumer.register_batch_handler('order_ready_for_fulfillment', self.warehouse_handler.handle_orders_ready_for_fulfillment)
         
         return consumer
     
-    def _handle_create(self, event):
+    @staticmethod
+    def _cdc_row(event):
         """
-        Handle CDC create events
+        Source table and columns of a Debezium row unwrapped by
+        ExtractNewRecordState (add.fields puts __op, __source_table... beside the columns)
         """
-        source_table = event.get('source', {}).get('table')
-        payload = event.get('payload', {})
-        
-        logger.info(f"CDC Create event: {source_table} - {payload.get('id')}")
-        
-        # Transform CDC event to domain event
-        if source_table == 'orders':
-            self.producer.publish_event(
-                topic='order_events',
-                event_type='order_created',
-                payload=payload,
-                key=str(payload.get('id'))
-            )
-        elif source_table == 'inventory':
-            self.producer.publish_event(
-                topic='inventory_events',
-                event_type='inventory_created',
-                payload=payload,
-                key=str(payload.get('id'))
-            )
-        # Add more mappings as needed
+        row = {key: value for key, value in event.items() if not key.startswith('__')}
+        return event.get('__source_table'), row
     
-    def _handle_update(self, event):
+    def _handle_cdc_batch(self, op, events):
         """
-        Handle CDC update events
+        Transform a run of CDC rows with the same op into domain events,
+        published with one publish_events call per topic and event type.
+        Order events are not derived from CDC: OrderService writes them to
+        the outbox with the change.
         """
-        source_table = event.get('source', {}).get('table')
-        payload = event.get('payload', {})
+        grouped = defaultdict(list)
+        for event in events:
+            table, row = self._cdc_row(event)
+            mapping = CDC_DOMAIN_EVENTS.get((op, table))
+            if mapping:
+                grouped[mapping].append((mapping[1], row, str(row.get('id'))))
         
-        logger.info(f"CDC Update event: {source_table} - {payload.get('id')}")
-        
-        # Transform CDC event to domain event
-        if source_table == 'inventory':
-            self.producer.publish_event(
-                topic='inventory_events',
-                event_type='inventory_updated',
-                payload=payload,
-                key=str(payload.get('id'))
-            )
-        elif source_table == 'orders':
-            self.producer.publish_event(
-                topic='order_events',
-                event_type='order_updated',
-                payload=payload,
-                key=str(payload.get('id'))
-            )
-        # Add more mappings as needed
+        logger.info(f"CDC '{op}' batch: {len(events)} rows, {sum(map(len, grouped.values()))} domain events")
+        for (topic, _), domain_events in grouped.items():
+            self.producer.publish_events(topic=topic, events=domain_events)
     
-    def _handle_delete(self, event):
+    def _reserve_inventory_batch(self, events):
         """
-        Handle CDC delete events
+        Reserve stock for a batch of reservation commands in one transaction
+        and publish an inventory_reserved result per command
         """
-        source_table = event.get('source', {}).get('table')
-        payload = event.get('payload', {})
+        commands = [event.get('payload', {}) for event in events]
+        logger.info(f"Reserving inventory for {len(commands)} commands")
         
-        logger.info(f"CDC Delete event: {source_table} - {payload.get('id')}")
+        try:
+            results = self.reservation_engine.reserve_batch(commands)
+        except Exception as e:
+            logger.error(f"Inventory reservation batch failed: {e}")
+            results = [
+                {
+                    'order_id': command.get('order_id'),
+                    'item_id': command.get('item_id'),
+                    'quantity': command.get('quantity'),
+                    'status': 'failed',
+                    'reason': 'error'
+                }
+                for command in commands
+            ]
         
-        # Transform CDC event to domain event based on table
-        # Add specific logic as needed
+        # Publish result events
+        self.producer.publish_events(
+            topic='inventory_events',
+            events=[('inventory_reserved', result, str(result['item_id'])) for result in results]
+        )
     
-    def _handle_reserve_inventory(self, event):
+    def _set_stock_batch(self, events):
         """
-        Handle inventory reservation command
+        Apply stock counts for hot items sent by processes that don't own the ledger
         """
-        payload = event.get('payload', {})
-        order_id = payload.get('order_id')
-        item_id = payload.get('item_id')
-        quantity = payload.get('quantity')
-        
-        logger.info(f"Reserving {quantity} units of item {item_id} for order {order_id}")
-        
-        # Implement inventory reservation logic
-        # This could update a database or call a service
-        
-        # Publish result event
-        self.producer.publish_event(
-            topic='inventory_events',
-            event_type='inventory_reserved',
-            payload={
-                'order_id': order_id,
-                'item_id': item_id,
-                'quantity': quantity,
-                'status': 'reserved'  # or 'failed' if not enough inventory
-            },
-            key=str(item_id)
-        )
+        for event in events:
+            payload = event.get('payload', {})
+            item_id = payload.get('item_id')
+            if not self.ledger or not self.ledger.is_hot(item_id):
+                logger.warning(f"Dropping set_stock for item {item_id}: not owned by this process's stock ledger")
+                continue
+            try:
+                self.ledger.set_quantity(item_id, payload['quantity'])
+            except ValueError as e:
+                logger.warning(f"Dropping set_stock for item {item_id}: {e}")
     
     def _handle_process_payment(self, event):
         """
@@ -227,10 +251,16 @@ class EventDistributionSystem:
         """
         logger.info("Starting Event Distribution System")
         
+        # Built before the event consumer starts, so no fulfillment request
+        # ever waits on the initial scan
+        if 'event' in self.consumers:
+            self.availability_index.start()
+        
         # Start all consumers
-        self.cdc_consumer.start()
-        self.command_consumer.start()
-        self.event_consumer.start()
+        for consumer in self.consumers.values():
+            consumer.start()
+        if 'event' in self.consumers:
+            self.low_stock_monitor.start()
         
         logger.info("Event Distribution System started")
     
@@ -241,11 +271,13 @@ class EventDistributionSystem:
         logger.info("Stopping Event Distribution System")
         
         # Stop all consumers
-        self.cdc_consumer.stop()
-        self.command_consumer.stop()
-        self.event_consumer.stop()
+        for consumer in self.consumers.values():
+            consumer.stop()
+        if 'event' in self.consumers:
+            self.availability_index.stop()
+            self.low_stock_monitor.stop()
         
-        # Flush any remaining messages
-        self.producer.flush()
+        # Deliver any remaining messages
+        self.producer.close()
         
         logger.info("Event Distribution System stopped")
\ No newline at end of file
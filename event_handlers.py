@@ -1,6 +1,10 @@
 # event_handlers.py
 import logging
+from collections import defaultdict
 from datetime import datetime
+from sqlalchemy import select
+
+from domains.order.models import OrderItem
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -9,8 +13,10 @@ class InventoryEventHandler:
     """
     Handles inventory-related events
     """
-    def __init__(self, db_session):
+    def __init__(self, db_session, availability_index=None, low_stock_monitor=None):
         self.db_session = db_session
+        self.availability_index = availability_index
+        self.low_stock_monitor = low_stock_monitor
     
     def handle_inventory_updated(self, event):
         """
@@ -22,17 +28,31 @@ class InventoryEventHandler:
         
         logger.info(f"Inventory updated: Item {item_id} now has {quantity} units")
         
-        # Implement inventory logic here
-        # For example, trigger alerts if stock is low
-        if quantity < 10:
-            self.trigger_low_stock_alert(item_id, quantity)
+        if quantity is None:
+            return
+        if self.availability_index:
+            self.availability_index.set_item_quantity(item_id, quantity)
+        
+        self.trigger_low_stock_alert(item_id, quantity, payload.get('product_id'))
+    
+    def handle_inventory_reserved(self, event):
+        """
+        Handle inventory reservation results
+        """
+        payload = event.get('payload', {})
+        if payload.get('status') != 'reserved':
+            return
+        if self.availability_index:
+            self.availability_index.set_item_quantity(payload.get('item_id'), payload.get('remaining'))
+        self.trigger_low_stock_alert(payload.get('item_id'), payload.get('remaining'))
     
-    def trigger_low_stock_alert(self, item_id, quantity):
+    def trigger_low_stock_alert(self, item_id, quantity, product_id=None):
         """
-        Trigger an alert for low stock
+        Queue a low stock alert; alerts are debounced per item and published
+        in batches by the monitor
         """
-        logger.warning(f"LOW STOCK ALERT: Item {item_id} has only {quantity} units left")
-        # Additional logic for sending notifications, etc.
+        if self.low_stock_monitor and quantity is not None:
+            self.low_stock_monitor.observe(item_id, quantity, product_id)
 
 
 class OrderEventHandler:
@@ -54,17 +74,21 @@ class OrderEventHandler:
         
         logger.info(f"New order {order_id} received for customer {customer_id}")
         
-        # Command pattern: issue command to update inventory
+        # Command pattern: issue command to update inventory. Items name either
+        # an inventory item ('id') or just a product ('product_id')
         for item in items:
+            item_id = item.get('id')
+            product_id = item.get('product_id')
             self.kafka_producer.publish_event(
                 topic='inventory_commands',
                 event_type='reserve_inventory',
                 payload={
                     'order_id': order_id,
-                    'item_id': item['id'],
+                    'item_id': item_id,
+                    'product_id': product_id,
                     'quantity': item['quantity']
                 },
-                key=str(item['id'])
+                key=str(item_id if item_id is not None else product_id)
             )
         
         # Publish event for other services
@@ -107,18 +131,59 @@ class WarehouseEventHandler:
     """
     Handles warehouse and fulfillment events
     """
-    def __init__(self, db_session):
+    def __init__(self, db_session, availability_index, kafka_producer=None):
         self.db_session = db_session
+        self.availability_index = availability_index
+        self.kafka_producer = kafka_producer
     
     def handle_order_ready_for_fulfillment(self, event):
         """
         Handle order fulfillment events
         """
-        payload = event.get('payload', {})
-        order_id = payload.get('order_id')
+        return self.handle_orders_ready_for_fulfillment([event])[0]
+    
+    def handle_orders_ready_for_fulfillment(self, events):
+        """
+        Plan fulfillment for a batch of orders; one query loads every order's demand
+        """
+        order_ids = [event.get('payload', {}).get('order_id') for event in events]
+        logger.info(f"Preparing {len(order_ids)} orders for fulfillment")
         
-        logger.info(f"Preparing order {order_id} for fulfillment")
+        # Warehouse choice comes from the index; only demand needs the database
+        demand = defaultdict(lambda: defaultdict(int))
+        rows = self.db_session.execute(
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity)
+            .where(OrderItem.order_id.in_(set(order_ids)))
+        ).all()
+        self.db_session.rollback()  # End the read transaction on the long-lived session
+        for order_id, product_id, quantity in rows:
+            demand[order_id][product_id] += quantity
         
-        # Implement warehouse logic here
-        # For example, select the best warehouse for fulfillment
-        # Create picking lists, etc.
\ No newline at end of file
+        plans = []
+        for order_id in order_ids:
+            plan = self.availability_index.plan(demand[order_id])
+            if not plan.allocations and plan.complete:
+                # No order lines: nothing to ship, and no plan to publish
+                logger.warning(f"Order {order_id} has no items to fulfill, skipping")
+            elif not plan.complete:
+                logger.warning(f"Order {order_id} can't be fully fulfilled, short: {plan.unfulfilled}")
+            elif plan.split:
+                logger.info(f"Order {order_id} split across warehouses {sorted(plan.allocations)}")
+            else:
+                logger.info(f"Order {order_id} fulfilled from warehouse {next(iter(plan.allocations))}")
+            plans.append(plan)
+        
+        if self.kafka_producer:
+            self.kafka_producer.publish_events(
+                topic='order_events',
+                events=[
+                    (
+                        'fulfillment_planned' if plan.complete else 'fulfillment_short',
+                        dict(plan.to_dict(), order_id=order_id),
+                        str(order_id)
+                    )
+                    for order_id, plan in zip(order_ids, plans)
+                    if plan.allocations or plan.unfulfilled
+                ]
+            )
+        return plans
@@ -0,0 +1,181 @@
+# metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (in milliseconds) of the connection wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# name -> callable returning a JSON-serializable snapshot
+_collectors = {}
+
+
+def register_collector(name, collector):
+    """
+    Register a callable whose snapshot is served under /metrics/{name}
+    """
+    _collectors[name] = collector
+
+
+class PoolStats:
+    """
+    Connection checkout wait times for a single engine's pool
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms):
+        with self._lock:
+            self._buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.count += 1
+            self.total_ms += wait_ms
+            self.max_ms = max(self.max_ms, wait_ms)
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def histogram(self):
+        """
+        Cumulative bucket counts, Prometheus style
+        """
+        with self._lock:
+            histogram = {}
+            running = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._buckets):
+                running += count
+                histogram[f"le_{bound}ms"] = running
+            histogram["le_inf"] = running + self._buckets[-1]
+            return {
+                "buckets": histogram,
+                "count": self.count,
+                "sum_ms": round(self.total_ms, 3),
+                "max_ms": round(self.max_ms, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every pool checkout, including the time spent queueing for a slot
+    """
+    stats = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            if self.stats:
+                self.stats.observe_timeout()
+            raise
+        if self.stats:
+            self.stats.observe((time.perf_counter() - start) * 1000)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting to the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# engine name -> (sync engine, PoolStats)
+_engines = {}
+
+
+def register_engine(name, engine):
+    """
+    Track a (sync) engine's pool under the given name
+    """
+    stats = PoolStats(name)
+    engine.pool.stats = stats
+    _engines[name] = (engine, stats)
+    return stats
+
+
+def pool_snapshot():
+    snapshot = {}
+    for name, (engine, stats) in _engines.items():
+        pool = engine.pool
+        entry = {"pool_class": type(pool).__name__, "wait_time": stats.histogram()}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # QueuePool reports negative overflow while under pool_size
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        snapshot[name] = entry
+    return snapshot
+
+
+register_collector("pools", pool_snapshot)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Record every statement an engine executes inside the block:
+
+        with count_queries(engine) as counter:
+            service.get_order(1)
+        assert counter.count == 2, counter.statements
+    """
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+router = APIRouter()
+
+@router.get("/")
+def get_all_metrics():
+    """Return every registered metrics snapshot."""
+    return {name: collector() for name, collector in _collectors.items()}
+
+@router.get("/{name}")
+def get_metrics(name: str):
+    """Return a single metrics snapshot (e.g. pools)."""
+    collector = _collectors.get(name)
+    if not collector:
+        raise HTTPException(status_code=404, detail=f"Unknown metrics collector: {name}")
+    return collector()
@@ -0,0 +1,228 @@
+# outbox.py
+"""
+Transactional outbox.
+
+Services write domain events into outbox_events with enqueue_event() in the
+same transaction (request unit of work) as the change they describe, so an
+event exists if and only if the change committed. OutboxRelay drains the
+table to Kafka in large batches and deletes what was delivered.
+
+Ordering: each event's aggregate key maps to one of OUTBOX_SHARDS shards.
+Run at most one relay per shard; it produces a shard's events in id order
+with an idempotent producer and stops producing at the first event rejected
+when produced. While deliveries succeed, events for a key reach Kafka (and,
+keyed, a single partition) in commit order. Ordering is best effort past a
+failure: an event whose delivery fails after it was produced (timeout, topic
+not authorized) is retried in a later batch, after later events of its shard
+on other partitions or topics were already delivered. Delivery is at least once.
+
+An event that keeps failing (oversized, topic missing or not authorized) is
+retried with backoff and parked after OUTBOX_MAX_ATTEMPTS, so it can't stall
+its shard; later events for that key are then published without it.
+"""
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from db import Base
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_SHARDS = int(os.getenv("OUTBOX_SHARDS", "16"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "1000"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.2"))
+OUTBOX_DELIVERY_TIMEOUT = float(os.getenv("OUTBOX_DELIVERY_TIMEOUT", "30"))
+# Failed deliveries of an event before it is parked instead of retried
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+# Wait after a failed batch, doubling per consecutive failure up to the max
+OUTBOX_RETRY_BACKOFF = float(os.getenv("OUTBOX_RETRY_BACKOFF", "1"))
+OUTBOX_RETRY_BACKOFF_MAX = float(os.getenv("OUTBOX_RETRY_BACKOFF_MAX", "60"))
+# The relay's producer profile; it must enable idempotence
+OUTBOX_PRODUCER_PROFILE = os.getenv("OUTBOX_PRODUCER_PROFILE", "throughput")
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    shard = Column(Integer, nullable=False)
+    topic = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)
+    aggregate_key = Column(String, nullable=True)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    last_error = Column(String, nullable=True)
+    parked_at = Column(DateTime, nullable=True)  # set once the relay gives up on the event
+
+    # The relay reads one shard's events in id order
+    __table_args__ = (
+        Index("ix_outbox_events_shard_id", "shard", "id"),
+    )
+
+
+def shard_for(key):
+    # Stable across processes and restarts, unlike hash()
+    return zlib.crc32(key.encode("utf-8")) % OUTBOX_SHARDS if key else 0
+
+
+def enqueue_event(db, topic, event_type, payload, key=None):
+    """
+    Add an event to the current transaction; it is published once the transaction commits
+    """
+    enqueue_events(db, topic, [(event_type, payload, key)])
+
+
+def enqueue_events(db, topic, events):
+    """
+    Add many (event_type, payload, key) events with one multi-row INSERT
+    """
+    if not events:
+        return
+    db.execute(insert(OutboxEvent), [
+        {
+            "shard": shard_for(key),
+            "topic": topic,
+            "event_type": event_type,
+            "aggregate_key": key,
+            "payload": payload,
+        }
+        for event_type, payload, key in events
+    ])
+
+
+class OutboxRelay:
+    def __init__(self, session_factory, producer, shards=None, batch_size=OUTBOX_BATCH_SIZE,
+                 poll_interval=OUTBOX_POLL_INTERVAL, delivery_timeout=OUTBOX_DELIVERY_TIMEOUT,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS, retry_backoff=OUTBOX_RETRY_BACKOFF,
+                 retry_backoff_max=OUTBOX_RETRY_BACKOFF_MAX):
+        # Without idempotence a retried message can land after a later one
+        # with the same key, and deleting every delivered row (not just the
+        # prefix) would publish out of order
+        if not producer.config.get("enable.idempotence"):
+            raise ValueError("OutboxRelay needs a producer with enable.idempotence (OUTBOX_PRODUCER_PROFILE)")
+        self.Session = session_factory
+        self.producer = producer
+        self.shards = sorted(shards) if shards is not None else list(range(OUTBOX_SHARDS))
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.delivery_timeout = delivery_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.consecutive_failures = 0
+        self.published = 0
+        self.failed = 0
+        self.parked = 0
+
+    def relay_batch(self):
+        """
+        Publish up to batch_size events and delete the delivered ones.
+        Returns the number of events delivered.
+        """
+        with self.Session.begin() as session:
+            # SKIP LOCKED: a second relay started on the same shards by mistake
+            # waits out this batch instead of publishing it twice
+            rows = session.execute(
+                select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.event_type,
+                       OutboxEvent.aggregate_key, OutboxEvent.payload, OutboxEvent.attempts)
+                .where(OutboxEvent.shard.in_(self.shards), OutboxEvent.parked_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not rows:
+                self.consecutive_failures = 0
+                return 0
+
+            futures = []
+            for _, topic, event_type, key, payload, _ in rows:
+                future = self.producer.publish_event(topic, event_type, payload, key)
+                futures.append(future)
+                if future.done() and future.exception() is not None:
+                    # Rejected before reaching the queue (e.g. too large): nothing
+                    # after it is produced, so no later event overtakes it
+                    break
+            self.producer.flush(self.delivery_timeout)
+
+            # With idempotence a partition's messages are delivered in order or
+            # fail from the first failure on. Delivered rows all go even when an
+            # earlier row failed: they are already in Kafka, and the failed row
+            # is retried after them (see Ordering above)
+            delivered, failures = [], []
+            for row, future in zip(rows, futures):
+                if not future.done():
+                    continue  # still in flight: retried next batch (at least once)
+                error = future.exception()
+                if error is None:
+                    delivered.append(row.id)
+                else:
+                    failures.append((row, error))
+
+            if delivered:
+                session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(delivered)))
+            for row, error in failures:
+                self._record_failure(session, row, error)
+            self.published += len(delivered)
+
+            if len(delivered) < len(rows):
+                self.failed += 1
+                self.consecutive_failures += 1
+                logger.error(f"Outbox relay delivered {len(delivered)}/{len(rows)} events, retrying the rest")
+            else:
+                self.consecutive_failures = 0
+            return len(delivered)
+
+    def _record_failure(self, session, row, error):
+        """
+        Count a failed attempt; after max_attempts the event is parked (dead
+        letter) so it stops blocking its shard. Parked events stay in the table
+        with their last error for inspection and are never retried.
+        """
+        attempts = row.attempts + 1
+        parked = attempts >= self.max_attempts
+        session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == row.id)
+            .values(attempts=attempts, last_error=str(error)[:1000],
+                    parked_at=datetime.utcnow() if parked else None)
+        )
+        if parked:
+            self.parked += 1
+            logger.error(f"Outbox event {row.id} ({row.event_type}) parked after {attempts} attempts: {error}")
+
+    def backoff(self):
+        """
+        Seconds to wait before the next batch after consecutive failed batches
+        """
+        if not self.consecutive_failures:
+            return 0
+        return min(self.retry_backoff * 2 ** (self.consecutive_failures - 1), self.retry_backoff_max)
+
+    def run(self, stop: threading.Event):
+        logger.info(f"Outbox relay running for shards {self.shards}")
+        while not stop.is_set():
+            try:
+                delivered = self.relay_batch()
+            except Exception as e:
+                logger.error(f"Outbox relay batch failed: {e}")
+                self.consecutive_failures += 1
+                delivered = 0
+            if self.consecutive_failures:
+                stop.wait(self.backoff())
+            # Keep draining while there's a backlog; otherwise poll
+            elif delivered < self.batch_size:
+                stop.wait(self.poll_interval)
+
+    def stats(self):
+        return {
+            "shards": self.shards,
+            "published": self.published,
+            "failed_batches": self.failed,
+            "parked": self.parked,
+            "consecutive_failures": self.consecutive_failures,
+        }
@@ -0,0 +1,124 @@
+# password_hasher.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from passlib.context import CryptContext
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HasherOverloaded(Exception):
+    """max_pending hash/verify calls are already queued or running; routes answer 503."""
+
+
+# Module-level so they can be pickled into the worker processes
+def _hash(password):
+    return pwd_context.hash(password)
+
+def _verify(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so hashing doesn't hold the API worker's GIL.
+
+    At most max_pending hash/verify calls may be queued or running; beyond that
+    callers get HasherOverloaded instead of piling up behind a login burst.
+    workers=0 hashes inline (useful for tests and tiny deployments).
+    """
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 8
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _submit(self, fn, *args):
+        if self.workers == 0:
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        if not self._slots.acquire(blocking=False):
+            raise HasherOverloaded("Password hashing is overloaded, retry shortly")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        """Blocking hash; the calling thread waits without holding the GIL."""
+        return self._submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(_verify, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify, plain_password, hashed_password))
+
+    def hash_many(self, passwords):
+        """
+        Hash a batch across all workers (bulk imports). Not subject to max_pending,
+        the caller already holds the whole batch.
+        """
+        passwords = list(passwords)
+        if self.workers == 0:
+            return [_hash(p) for p in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_executor().map(_hash, passwords, chunksize=chunksize))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher():
+    """
+    Return the process-wide PasswordHasher.
+
+    PASSWORD_HASH_WORKERS sets the pool size (default: CPU count, 0 = inline),
+    PASSWORD_HASH_MAX_PENDING the queue bound.
+    """
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                workers = os.getenv("PASSWORD_HASH_WORKERS")
+                max_pending = os.getenv("PASSWORD_HASH_MAX_PENDING")
+                _hasher = PasswordHasher(
+                    workers=int(workers) if workers is not None else None,
+                    max_pending=int(max_pending) if max_pending else None
+                )
+                logger.info(f"Password hasher using {_hasher.workers} worker processes")
+    return _hasher
+
+def shutdown_password_hasher():
+    if _hasher is not None:
+        _hasher.shutdown()
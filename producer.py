@@ -1,21 +1,145 @@
 # producer.py
+import os
 import time
+import threading
+import functools
+from concurrent.futures import Future
 from confluent_kafka import Producer
-import json
 import socket
 import logging
 
+from metrics import register_collector
+from serialization import CONTENT_TYPE_HEADER, get_serializer
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Producer settings per KAFKA_PRODUCER_PROFILE. "throughput" trades a few
+# milliseconds of latency for larger, compressed batches; idempotence keeps
+# the retries that come with it from duplicating or reordering messages.
+PRODUCER_PROFILES = {
+    'default': {},
+    'throughput': {
+        'linger.ms': 20,
+        'batch.size': 1048576,
+        'compression.type': 'lz4',
+        'enable.idempotence': True,
+        'acks': 'all',
+        'queue.buffering.max.messages': 500000,
+    },
+}
+
+# Individual overrides, applied on top of the profile
+PRODUCER_ENV_SETTINGS = {
+    'KAFKA_PRODUCER_LINGER_MS': ('linger.ms', int),
+    'KAFKA_PRODUCER_BATCH_SIZE': ('batch.size', int),
+    'KAFKA_PRODUCER_COMPRESSION': ('compression.type', str),
+    'KAFKA_PRODUCER_IDEMPOTENCE': ('enable.idempotence', lambda value: value.lower() in ('1', 'true', 'yes')),
+    'KAFKA_PRODUCER_ACKS': ('acks', str),
+}
+
+def producer_config(bootstrap_servers, profile=None):
+    """
+    confluent_kafka settings for a profile (KAFKA_PRODUCER_PROFILE by default)
+    plus any KAFKA_PRODUCER_* overrides
+    """
+    profile = profile or os.getenv('KAFKA_PRODUCER_PROFILE', 'default')
+    if profile not in PRODUCER_PROFILES:
+        raise ValueError(f"Unknown Kafka producer profile: {profile}")
+    config = {
+        'bootstrap.servers': bootstrap_servers,
+        'client.id': socket.gethostname(),
+    }
+    config.update(PRODUCER_PROFILES[profile])
+    for env_name, (setting, parse) in PRODUCER_ENV_SETTINGS.items():
+        value = os.getenv(env_name)
+        if value:
+            config[setting] = parse(value)
+    return config
+
+
+class KafkaDeliveryError(Exception):
+    """A message the broker did not accept; set on the message's delivery future."""
+
+
+class DeliveryStats:
+    """
+    Delivery counters, in place of a log line per message
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.produce_errors = 0
+        self.queue_full_retries = 0
+        self.last_error = None
+
+    def increment(self, counter, error=None):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if error is not None:
+                self.last_error = str(error)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'produced': self.produced,
+                'delivered': self.delivered,
+                'failed': self.failed,
+                'produce_errors': self.produce_errors,
+                'queue_full_retries': self.queue_full_retries,
+                'in_flight': self.produced - self.delivered - self.failed,
+                'last_error': self.last_error,
+            }
+
+
 class KafkaProducer:
-    def __init__(self, bootstrap_servers='kafka:9092'):
-        self.producer = Producer({
-            'bootstrap.servers': bootstrap_servers,
-            'client.id': socket.gethostname()
-        })
+    def __init__(self, bootstrap_servers='kafka:9092', profile=None, name=None, event_format=None):
+        self.config = producer_config(bootstrap_servers, profile)
+        self.producer = Producer(self.config)
+        # KAFKA_EVENT_FORMAT by default; consumers read the format from each message's header
+        self.serializer = get_serializer(event_format)
+        self._headers = [(CONTENT_TYPE_HEADER, self.serializer.content_type.encode('utf-8'))]
+        self.stats = DeliveryStats()
+        if name:
+            register_collector(f"kafka_producer_{name}", self.stats.snapshot)
+        
+        # Delivery callbacks are served here instead of polling after every produce
+        self._closed = threading.Event()
+        self._poll_thread = threading.Thread(target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+        self._poll_thread.start()
+    
+    def _poll_loop(self):
+        while not self._closed.is_set():
+            self.producer.poll(0.1)
+    
+    def _produce(self, topic, value, key, on_delivery):
+        future = Future()
+        callback = functools.partial(self._delivery_report, future, on_delivery)
+        kwargs = dict(
+            topic=topic,
+            key=key.encode('utf-8') if key else None,
+            value=value,
+            headers=self._headers,
+            callback=callback
+        )
+        try:
+            try:
+                self.producer.produce(**kwargs)
+            except BufferError:
+                # Local queue is full: wait for deliveries to make room, then retry once
+                self.stats.increment('queue_full_retries')
+                self.producer.poll(1)
+                self.producer.produce(**kwargs)
+            self.stats.increment('produced')
+        except Exception as e:
+            self.stats.increment('produce_errors', e)
+            logger.error(f"Error producing message to {topic}: {e}")
+            future.set_exception(e)
+        return future
     
-    def publish_event(self, topic, event_type, payload, key=None):
+    def publish_event(self, topic, event_type, payload, key=None, on_delivery=None):
         """
         Publish an event to a Kafka topic
         
@@ -24,36 +148,120 @@ class KafkaProducer:
             event_type (str): Type of event (e.g., 'order_created', 'inventory_updated')
             payload (dict): Event data
             key (str, optional): Event key for partitioning
+            on_delivery (callable, optional): Called with (error, message) once delivered or failed
+        
+        Returns:
+            concurrent.futures.Future resolving to (topic, partition, offset),
+            or raising KafkaDeliveryError
         """
         message = {
             'event_type': event_type,
             'payload': payload,
             'timestamp': int(time.time() * 1000)
         }
+        return self._produce(topic, self.serializer.dumps(message), key, on_delivery)
+    
+    def publish_events(self, topic, events, on_delivery=None):
+        """
+        Publish many events to a topic
         
-        try:
-            self.producer.produce(
-                topic=topic,
-                key=key.encode('utf-8') if key else None,
-                value=json.dumps(message).encode('utf-8'),
-                callback=self._delivery_report
-            )
-            # Trigger any available delivery callbacks
-            self.producer.poll(0)
-        except Exception as e:
-            logger.error(f"Error producing message to {topic}: {e}")
+        Args:
+            topic (str): Kafka topic name
+            events (list): (event_type, payload, key) tuples
+            on_delivery (callable, optional): Called with (error, message) per event
+        
+        Returns:
+            list of delivery futures, in event order
+        """
+        timestamp = int(time.time() * 1000)
+        futures = []
+        for event_type, payload, key in events:
+            message = {
+                'event_type': event_type,
+                'payload': payload,
+                'timestamp': timestamp
+            }
+            futures.append(self._produce(topic, self.serializer.dumps(message), key, on_delivery))
+        return futures
     
-    def _delivery_report(self, err, msg):
+    def _delivery_report(self, future, on_delivery, err, msg):
         """
         Called once for each message produced to indicate delivery result.
         """
         if err is not None:
-            logger.error(f"Message delivery failed: {err}")
+            self.stats.increment('failed', err)
+            future.set_exception(KafkaDeliveryError(str(err)))
         else:
-            logger.info(f"Message delivered to {msg.topic()} [{msg.partition()}]")
+            self.stats.increment('delivered')
+            future.set_result((msg.topic(), msg.partition(), msg.offset()))
+        if on_delivery:
+            try:
+                on_delivery(err, msg)
+            except Exception as e:
+                logger.error(f"Delivery callback failed: {e}")
     
-    def flush(self):
+    def flush(self, timeout=None):
         """
         Wait for all messages in the Producer queue to be delivered.
         """
-        self.producer.flush()
\ No newline at end of file
+        if timeout is None:
+            return self.producer.flush()
+        return self.producer.flush(timeout)
+    
+    def close(self):
+        """
+        Deliver what's queued and stop the poll thread
+        """
+        self.flush()
+        self._closed.set()
+        self._poll_thread.join(timeout=5)
+
+
+# Shared producer for the API process, created on first use so importing the
+# app never waits on broker configuration
+_producer = None
+_producer_lock = threading.Lock()
+
+def get_kafka_producer():
+    """
+    Return the process-wide KafkaProducer, creating it on first call.
+    Returns None if the producer cannot be created.
+    """
+    global _producer
+    if _producer is None:
+        with _producer_lock:
+            if _producer is None:
+                try:
+                    _producer = KafkaProducer(bootstrap_servers=os.getenv("KAFKA_SERVERS", "kafka:9092"), name="api")
+                    logger.info("Kafka producer initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Kafka producer: {e}")
+                    return None
+    return _producer
+
+def flush_kafka_producer():
+    """Deliver queued messages and stop the shared producer if it was ever created."""
+    if _producer is not None:
+        _producer.close()
+
+def publish_event(topic, event_type, payload, key=None):
+    """Publish an event to Kafka if the producer is available"""
+    kafka_producer = get_kafka_producer()
+    if kafka_producer:
+        try:
+            kafka_producer.publish_event(topic, event_type, payload, key)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish event: {e}")
+    return False
+
+def publish_events(topic, events):
+    """Publish a batch of (event_type, payload, key) events if the producer is available"""
+    kafka_producer = get_kafka_producer()
+    if kafka_producer:
+        try:
+            kafka_producer.publish_events(topic, events)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish events: {e}")
+    return False
@@ -0,0 +1,112 @@
+# serialization.py
+"""
+Event serializers shared by the Kafka producer and consumers.
+
+Producers tag every message with a content-type header naming its format;
+consumers pick the deserializer from that header, so a topic can carry a mix
+of formats while producers migrate. Messages without the header (Debezium,
+events written before the header existed) are read as JSON.
+
+    KAFKA_EVENT_FORMAT=json      # orjson when installed, stdlib json otherwise
+    KAFKA_EVENT_FORMAT=msgpack   # compact binary, needs the msgpack package
+"""
+import datetime
+import enum
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary format
+    msgpack = None
+
+CONTENT_TYPE_HEADER = "content-type"
+
+
+class DeserializationError(ValueError):
+    """A message body that its declared format could not decode."""
+
+
+def _default(value):
+    # Types the events carry that neither backend encodes natively
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+class JsonSerializer:
+    name = "json"
+    content_type = "application/json"
+
+    def dumps(self, obj) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes):
+        try:
+            if orjson is not None:
+                return orjson.loads(data)
+            return json.loads(data)
+        except ValueError as e:
+            raise DeserializationError(str(e)) from e
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def dumps(self, obj) -> bytes:
+        return msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False)
+
+    def loads(self, data: bytes):
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise DeserializationError(str(e)) from e
+
+
+SERIALIZERS = {"json": JsonSerializer, "msgpack": MsgpackSerializer}
+_by_content_type = {cls.content_type: cls() for cls in SERIALIZERS.values()}
+
+
+def get_serializer(name=None):
+    """
+    Serializer for new messages; KAFKA_EVENT_FORMAT by default
+    """
+    name = name or os.getenv("KAFKA_EVENT_FORMAT", "json")
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown event format: {name}")
+    if name == "msgpack" and msgpack is None:
+        raise RuntimeError("KAFKA_EVENT_FORMAT=msgpack needs the msgpack package")
+    return _by_content_type[SERIALIZERS[name].content_type]
+
+
+def content_type_of(headers):
+    """
+    The content-type header of a confluent_kafka message (list of (key, bytes) or None)
+    """
+    for key, value in headers or ():
+        if key == CONTENT_TYPE_HEADER and value is not None:
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+    return None
+
+
+def decode_message(value: bytes, headers=None):
+    """
+    Deserialize a message body using the format named in its headers
+    """
+    content_type = content_type_of(headers) or JsonSerializer.content_type
+    serializer = _by_content_type.get(content_type)
+    if serializer is None:
+        raise DeserializationError(f"Unsupported content type: {content_type}")
+    if serializer.name == "msgpack" and msgpack is None:
+        raise DeserializationError("Received a msgpack message but the msgpack package isn't installed")
+    return serializer.loads(value)
@@ -0,0 +1,139 @@
+import csv
+import io
+from contextlib import contextmanager
+
+import db  # noqa: F401  (import first: db <-> models import cycle)
+from domains.customer.bulk_import import CustomerBulkImporter
+
+
+class _Copy:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def write(self, data):
+        self.cursor.copied += data
+
+
+class _Cursor:
+    """
+    DBAPI cursor surface used by the importer. Inserts every staged row
+    except emails listed in conflicts.
+    """
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        self.statements = []
+        self.copied = ""
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def fetchall(self):
+        return [(row[1],) for row in csv.reader(io.StringIO(self.copied)) if row[1] not in self.conflicts]
+
+
+class _Psycopg3Cursor(_Cursor):
+    @contextmanager
+    def copy(self, statement):
+        self.statements.append(statement)
+        yield _Copy(self)
+
+
+class _Psycopg2Cursor(_Cursor):
+    def copy_expert(self, statement, buffer):
+        self.statements.append(statement)
+        self.copied += buffer.read()
+
+
+class _RawConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Result:
+    def __init__(self, emails):
+        self.emails = emails
+
+    def scalars(self):
+        return iter(self.emails)
+
+
+class _Connection:
+    def __init__(self, existing):
+        self.existing = existing
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params):
+        return _Result([email for email in params["emails"] if email in self.existing])
+
+
+class _StubEngine:
+    def __init__(self, cursor, existing=()):
+        self.raw = _RawConnection(cursor)
+        self.existing = set(existing)
+
+    def connect(self):
+        return _Connection(self.existing)
+
+    def raw_connection(self):
+        return self.raw
+
+
+class _StubHasher:
+    def hash_many(self, passwords):
+        return [f"hashed:{password}" for password in passwords]
+
+
+def _rows(*emails):
+    return [
+        (number, {"name": f"n{number}", "email": email, "contact_number": "1", "password": "pw"})
+        for number, email in enumerate(emails, start=2)
+    ]
+
+
+def test_load_batch_copies_with_psycopg3():
+    cursor = _Psycopg3Cursor(conflicts={"race@example.com"})
+    engine = _StubEngine(cursor, existing={"old@example.com"})
+    importer = CustomerBulkImporter(db_engine=engine, hasher=_StubHasher())
+
+    result = importer.import_rows(_rows("a@example.com", "old@example.com", "race@example.com", "a@example.com"))
+
+    assert engine.raw.committed
+    assert any(statement.startswith("COPY customer_import") for statement in cursor.statements)
+    assert list(csv.reader(io.StringIO(cursor.copied))) == [
+        ["n2", "a@example.com", "1", "hashed:pw"],
+        ["n4", "race@example.com", "1", "hashed:pw"],
+    ]
+    assert result.imported == 1
+    assert [(f["row"], f["error"]) for f in result.failures] == [
+        (5, "Duplicate email in import"),
+        (3, "Email already registered"),
+        (4, "Email already registered"),
+    ]
+
+
+def test_load_batch_copies_with_psycopg2():
+    cursor = _Psycopg2Cursor(conflicts=set())
+    importer = CustomerBulkImporter(db_engine=_StubEngine(cursor), hasher=_StubHasher())
+
+    result = importer.import_rows(_rows("a@example.com", "b@example.com"))
+
+    assert result.imported == 2
+    assert result.failures == []
@@ -0,0 +1,72 @@
+import db  # noqa: F401  (import first: db <-> models import cycle)
+from domains.inventory.availability import AvailabilityIndex
+from event_handlers import WarehouseEventHandler
+
+
+class _Rows:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return list(self._rows)
+
+
+class _StubSession:
+    """
+    Returns the same rows for any query: inventory rows for the index,
+    order lines for the handler.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, *args):
+        return _Rows(self.rows)
+
+    def rollback(self):
+        pass
+
+
+class _RecordingProducer:
+    def __init__(self):
+        self.published = []
+
+    def publish_events(self, topic, events):
+        self.published.extend(events)
+
+
+def _index(inventory_rows):
+    # (item_id, product_id, warehouse_id, quantity)
+    index = AvailabilityIndex(lambda: _StubSession(inventory_rows))
+    index.rebuild()
+    return index
+
+
+def test_empty_order_is_skipped_without_aborting_the_batch():
+    # Order 1 has no lines; order 2 ships product 5 from warehouse 9
+    producer = _RecordingProducer()
+    handler = WarehouseEventHandler(_StubSession([(2, 5, 3)]), _index([(1, 5, 9, 10)]), producer)
+
+    plans = handler.handle_orders_ready_for_fulfillment([
+        {'payload': {'order_id': 1}},
+        {'payload': {'order_id': 2}},
+    ])
+
+    assert plans[0].allocations == {} and plans[0].unfulfilled == {}
+    assert plans[1].allocations == {9: {5: 3}}
+    assert [(event_type, key) for event_type, _, key in producer.published] == [('fulfillment_planned', '2')]
+
+
+def test_single_empty_order():
+    producer = _RecordingProducer()
+    handler = WarehouseEventHandler(_StubSession([]), _index([]), producer)
+
+    plan = handler.handle_order_ready_for_fulfillment({'payload': {'order_id': 1}})
+
+    assert plan.allocations == {}
+    assert producer.published == []
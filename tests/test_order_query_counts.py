@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from db import Base  # noqa: E402  (import first: db <-> models import cycle)
+from domains.customer.models import Customer, CustomerPreference  # noqa: E402
+from domains.order.models import Order, OrderItem, OrderTracking  # noqa: E402
+from domains.order.routes import list_customer_orders  # noqa: E402
+from domains.order.schemas import OrderPage  # noqa: E402
+from metrics import count_queries  # noqa: E402
+
+TABLES = [table.__table__ for table in (Customer, Order, OrderItem, OrderTracking, CustomerPreference)]
+
+
+async def _list_orders(orders, items_per_order, limit):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=TABLES)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session.begin() as db:
+        db.add(Customer(id=1, name="c", email="c@example.com", contact_number="1", hashed_password="x"))
+        for order_id in range(1, orders + 1):
+            db.add(Order(id=order_id, customer_id=1, items=[
+                OrderItem(product_id=product_id, quantity=1, unit_price=2.0)
+                for product_id in range(items_per_order)
+            ]))
+
+    async with Session() as db:
+        # Everything the endpoint does, including serializing the response
+        with count_queries(engine.sync_engine) as counter:
+            page = await list_customer_orders(customer_id=1, limit=limit, before=None, status=None, db=db)
+            OrderPage.model_validate(page)
+    await engine.dispose()
+    return page, counter
+
+
+@pytest.mark.parametrize("orders,items_per_order", [(1, 1), (20, 5)])
+def test_customer_order_list_is_two_queries(orders, items_per_order):
+    # One page of orders, then their items with one SELECT ... IN; no lazy loads
+    page, counter = asyncio.run(_list_orders(orders, items_per_order, limit=10))
+    assert counter.count == 2, counter.statements
+    assert len(page["orders"]) == min(orders, 10)
+    assert all(len(order.items) == items_per_order for order in page["orders"])
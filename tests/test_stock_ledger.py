@@ -0,0 +1,128 @@
+import os
+from contextlib import contextmanager
+
+import db  # noqa: F401  (import first: db <-> models import cycle)
+import pytest
+
+from domains.inventory.stock_ledger import HotStockLedger, StockLedgerOwned
+
+
+class _Result:
+    def __init__(self, scalar=None, row=None):
+        self._scalar = scalar
+        self._row = row
+
+    def scalar(self):
+        return self._scalar
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self._row
+
+
+class _StubSession:
+    """
+    Stands in for the database: the checkpoint query returns last_seq, owner
+    locks are granted unless the item id is in owned_elsewhere, and the item
+    query returns a row with quantity 100. Writes are recorded.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def connection(self, execution_options=None):
+        return None
+
+    def close(self):
+        pass
+
+    def execute(self, statement, *args):
+        self.factory.statements.append((statement, args))
+        text = str(statement)
+        if "pg_try_advisory_lock" in text:
+            return _Result(scalar=args[0]["item_id"] not in self.factory.owned_elsewhere)
+        if "pg_advisory_unlock" in text:
+            return _Result(scalar=True)
+        if "stock_ledger_checkpoints.last_seq" in text and text.lstrip().upper().startswith("SELECT"):
+            return _Result(scalar=self.factory.last_seq)
+        return _Result(row={"quantity": 100, "product_id": 1, "price": 1.0,
+                            "inventory_id": 1, "low_stock_threshold": 10})
+
+
+class _StubSessionFactory:
+    def __init__(self, last_seq=0, owned_elsewhere=()):
+        self.last_seq = last_seq
+        self.owned_elsewhere = set(owned_elsewhere)
+        self.statements = []
+
+    def __call__(self):
+        return _StubSession(self)
+
+    @contextmanager
+    def begin(self):
+        yield _StubSession(self)
+
+
+def test_idle_flush_keeps_open_segment_and_appends_replay(tmp_path):
+    log_dir = str(tmp_path)
+    ledger = HotStockLedger(_StubSessionFactory(), [7], log_dir=log_dir, ledger_id="t")
+
+    # Nothing appended yet: the flush must not unlink the open segment
+    assert ledger.flush() == 0
+    segments = os.listdir(log_dir)
+    assert len(segments) == 1
+    assert os.fstat(ledger._segment.fileno()).st_nlink == 1
+
+    assert ledger.try_reserve(7, 3) == 97
+    ledger._segment.close()  # crash before the next flush
+
+    restarted = HotStockLedger(_StubSessionFactory(), [7], log_dir=log_dir, ledger_id="t")
+    assert restarted.items[7].pending == -3
+    assert restarted.get_item(7).quantity == 97
+
+
+def test_flush_after_replay_keeps_new_appends(tmp_path):
+    log_dir = str(tmp_path)
+    ledger = HotStockLedger(_StubSessionFactory(), [7], log_dir=log_dir, ledger_id="t")
+    ledger.try_reserve(7, 2)
+    ledger._segment.close()
+
+    # Replayed deltas are flushed, then a new append must survive another restart
+    restarted = HotStockLedger(_StubSessionFactory(), [7], log_dir=log_dir, ledger_id="t")
+    assert restarted.flush() == 1
+    assert restarted.try_reserve(7, 5) == 95
+    restarted._segment.close()
+
+    again = HotStockLedger(_StubSessionFactory(last_seq=1), [7], log_dir=log_dir, ledger_id="t")
+    assert again.items[7].pending == -5
+
+
+def test_second_owner_fails_fast(tmp_path):
+    factory = _StubSessionFactory(owned_elsewhere={8})
+    with pytest.raises(StockLedgerOwned):
+        HotStockLedger(factory, [7, 8], log_dir=str(tmp_path), ledger_id="t")
+    # The lock already taken for item 7 is given back
+    assert any("pg_advisory_unlock" in str(statement) for statement, _ in factory.statements)
+
+
+def test_replay_keeps_hot_set_and_writes_back_retired_items(tmp_path):
+    log_dir = str(tmp_path)
+    ledger = HotStockLedger(_StubSessionFactory(), [7, 8], log_dir=log_dir, ledger_id="t")
+    ledger.try_reserve(7, 1)
+    ledger.try_reserve(8, 4)
+    ledger._segment.close()
+
+    # Item 8 is no longer hot: it isn't served from memory, but its delta is flushed
+    factory = _StubSessionFactory()
+    restarted = HotStockLedger(factory, [7], log_dir=log_dir, ledger_id="t")
+    assert list(restarted.items) == [7]
+    assert not restarted.is_hot(8)
+    assert restarted.flush() == 2
+    assert restarted._retired == {}
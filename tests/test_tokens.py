@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import db  # noqa: F401  (import first: db <-> models import cycle)
+from domains.authentication import tokens
+from domains.authentication.tokens import TokenDenylist
+
+
+class _Rows:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return list(self._rows)
+
+
+class _RevokedTokensTable:
+    """
+    Stands in for revoked_tokens: the logout transaction's inserts are
+    stored, and every session's SELECT returns them
+    """
+    def __init__(self):
+        self.rows = {}
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, *args):
+        if statement.is_insert:
+            params = statement.compile().params
+            self.rows[params["digest"]] = params["expires_at"]
+        if statement.is_select:
+            return _Rows(self.rows.items())
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = _RevokedTokensTable()
+    monkeypatch.setattr(tokens, "token_denylist", TokenDenylist(table, refresh_seconds=0))
+    return table
+
+
+def _token(user_id=1):
+    return tokens.issue_token(SimpleNamespace(id=user_id, email=f"{user_id}@example.com", username=str(user_id)))
+
+
+def test_logout_revokes_token(table):
+    token = _token()
+    assert tokens.verify_token(token)["sub"] == 1
+
+    tokens.revoke_token(table, token)
+
+    with pytest.raises(HTTPException) as e:
+        tokens.verify_token(token)
+    assert e.value.status_code == 401
+    assert tokens.verify_token(_token(2))["sub"] == 2
+
+
+def test_revocation_reaches_other_processes(table):
+    token = _token()
+    tokens.revoke_token(table, token)
+
+    # Another process: nothing revoked locally, only what the table holds
+    other = TokenDenylist(table, refresh_seconds=0)
+    assert other.contains(tokens.token_cache.digest(token))
+    assert not other.contains(tokens.token_cache.digest("someone-else"))